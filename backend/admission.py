@@ -0,0 +1,177 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from starlette.responses import JSONResponse
+
+from executor import VOICE_PIPELINE_CONCURRENCY
+from observability import (ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS,
+                           logger, route_path)
+
+# Voice requests (/transcribe/, /ws/transcribe/, /synthesize/) running at once per worker; 0 turns
+# admission control off for them. Defaults to the voice pipeline executor's size, so admitted
+# requests can keep every executor thread busy without queueing inside the executor.
+VOICE_MAX_IN_FLIGHT = int(os.getenv('VOICE_MAX_IN_FLIGHT', str(VOICE_PIPELINE_CONCURRENCY)))
+# Voice requests that may wait for a slot; more are rejected with 429 straight away
+VOICE_MAX_QUEUE = int(os.getenv('VOICE_MAX_QUEUE', '16'))
+# Seconds a voice request waits for a slot before it is rejected with 503
+VOICE_QUEUE_TIMEOUT_SECONDS = float(os.getenv('VOICE_QUEUE_TIMEOUT_SECONDS', '10'))
+# The same for the availability endpoints (/timeslots/...), which are cheap and kept apart so the
+# Doctor page stays responsive while the voice pool is saturated
+ADMIN_MAX_IN_FLIGHT = int(os.getenv('ADMIN_MAX_IN_FLIGHT', '32'))
+ADMIN_MAX_QUEUE = int(os.getenv('ADMIN_MAX_QUEUE', '64'))
+ADMIN_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMIN_QUEUE_TIMEOUT_SECONDS', '2'))
+
+VOICE_ENDPOINTS = {"/transcribe/", "/ws/transcribe/", "/synthesize/"}
+ADMIN_ENDPOINT_PREFIX = "/timeslots/"
+# Close code asking a WebSocket client to try again later
+WS_TRY_AGAIN_LATER = 1013
+
+
+class Rejected(Exception):
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps how many requests of one pool run at the same time in this worker. Requests over the cap
+    wait in a bounded FIFO queue for up to queue_timeout seconds: a finishing request hands its
+    slot straight to the first one waiting. When the queue is full a request is rejected at once
+    with 429, and when its wait runs out with 503, both with a Retry-After estimate.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, queue_timeout):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of how long an admitted request holds its slot, for Retry-After
+        self.hold_seconds = 1.0
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.labels(self.name).inc()
+            self._admitted(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(429, "queue_full", "Too many requests are waiting; try again shortly.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(self.name).inc()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the wait ran out
+            if not waiter.done() or waiter.cancelled():
+                raise self._reject(503, "timeout", "The service is busy; try again shortly.")
+        except BaseException:
+            # Cancelled after the slot was handed over: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.labels(self.name).dec()
+        self._admitted(time.perf_counter() - started)
+
+    def release(self, held_seconds=None):
+        if held_seconds is not None:
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * held_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the next request in line without going back to the pool
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(self.name).dec()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.max_in_flight <= 0:
+            yield
+            return
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def retry_after(self):
+        # Roughly when the requests now waiting will have been served
+        return max(1, math.ceil(self.hold_seconds * (len(self._waiters) + 1) / max(self.max_in_flight, 1)))
+
+    def stats(self):
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mean_hold_seconds": round(self.hold_seconds, 3),
+        }
+
+    def _admitted(self, waited):
+        self.admitted += 1
+        ADMISSION_WAIT_SECONDS.labels(self.name).observe(waited)
+
+    def _reject(self, status_code, reason, detail):
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.name, reason).inc()
+        logger.warning("Request rejected by admission control", extra={"pool": self.name, "reason": reason})
+        return Rejected(status_code, detail, self.retry_after())
+
+
+voice_admission = AdmissionController("voice", VOICE_MAX_IN_FLIGHT, VOICE_MAX_QUEUE, VOICE_QUEUE_TIMEOUT_SECONDS)
+admin_admission = AdmissionController("admin", ADMIN_MAX_IN_FLIGHT, ADMIN_MAX_QUEUE, ADMIN_QUEUE_TIMEOUT_SECONDS)
+
+
+def controller_for(endpoint):
+    if endpoint in VOICE_ENDPOINTS:
+        return voice_admission
+    if endpoint.startswith(ADMIN_ENDPOINT_PREFIX):
+        return admin_admission
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    Runs voice and admin requests inside a slot of their pool's AdmissionController. The slot is
+    held until the (possibly streamed) response has been sent, and requests are queued before their
+    upload is read, so waiting requests do not hold audio buffers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        controller = controller_for(route_path(scope)) if scope["type"] in ("http", "websocket") else None
+        if controller is None:
+            return await self.app(scope, receive, send)
+        try:
+            async with controller.slot():
+                await self.app(scope, receive, send)
+        except Rejected as e:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": WS_TRY_AGAIN_LATER, "reason": e.detail})
+                return
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code,
+                                    headers={"Retry-After": str(e.retry_after)})
+            await response(scope, receive, send)
@@ -0,0 +1,232 @@
+import io
+import os
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+from fastapi import HTTPException, UploadFile
+
+from observability import logger
+
+# Largest upload accepted by /transcribe/, in bytes
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+# Longest utterance accepted, in seconds (Google's synchronous recognize limit is 60 seconds)
+MAX_AUDIO_SECONDS = float(os.getenv('MAX_AUDIO_SECONDS', '60'))
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+MAX_CHANNELS = 2
+# Plain PCM and WAVE_FORMAT_EXTENSIBLE, which browsers and recorders use for PCM as well
+PCM_FORMATS = (0x0001, 0xFFFE)
+# Set to 0 to send uploads to the recognizer without trimming silence
+VAD_ENABLED = os.getenv('VAD_ENABLED', '1') != '0'
+# Length of the frames whose energy decides between speech and silence
+VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', '20'))
+# Frames quieter than this are always silence, in dB relative to full scale
+VAD_MIN_DBFS = float(os.getenv('VAD_MIN_DBFS', '-50'))
+# How far above the recording's noise floor a frame must be to count as speech, in dB
+VAD_MARGIN_DB = float(os.getenv('VAD_MARGIN_DB', '12'))
+# Audio kept before the first and after the last speech frame, so soft word edges are not cut
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '200'))
+# Recordings with less speech than this are rejected without calling the recognizer
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '150'))
+# Set to 1 to send stereo uploads as mono
+AUDIO_DOWNMIX = os.getenv('AUDIO_DOWNMIX', '0') != '0'
+# Sample rate uploads above it are downsampled to before recognition (Google recommends 16000); 0 keeps theirs
+AUDIO_TARGET_SAMPLE_RATE = int(os.getenv('AUDIO_TARGET_SAMPLE_RATE', '0'))
+
+
+@dataclass
+class WavAudio:
+    """
+    A validated WAV upload. `buffer` is a view over the whole upload; `data` views just the samples.
+    """
+    buffer: memoryview
+    data: memoryview
+    sample_rate: int
+    channels: int
+    bits_per_sample: int
+    audio_format: int
+
+    @property
+    def duration(self):
+        bytes_per_second = self.sample_rate * self.channels * self.bits_per_sample // 8
+        return len(self.data) / bytes_per_second if bytes_per_second else 0.0
+
+    def release(self):
+        # The upload's in-memory buffer cannot be closed while views over it are alive
+        self.data.release()
+        self.buffer.release()
+
+
+def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Returns a memoryview over the uploaded bytes without writing them anywhere. Small uploads that
+    Starlette kept in memory are exposed zero-copy; spooled-to-disk ones are read exactly once.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Audio upload exceeds {max_bytes} bytes")
+
+    spooled = getattr(file.file, '_file', file.file)
+    if isinstance(spooled, io.BytesIO):
+        view = spooled.getbuffer()
+    else:
+        file.file.seek(0)
+        view = memoryview(file.file.read(max_bytes + 1))
+
+    if len(view) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Audio upload exceeds {max_bytes} bytes")
+    return view
+
+
+def parse_wav_header(view: memoryview):
+    """
+    Walks the RIFF chunks to find 'fmt ' and 'data' without decoding any samples.
+    """
+    if len(view) < 12 or view[0:4] != b'RIFF' or view[8:12] != b'WAVE':
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid WAV file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset:offset + 4].tobytes()
+        chunk_size, = struct.unpack_from('<I', view, offset + 4)
+        body = offset + 8
+        if chunk_id == b'fmt ' and chunk_size >= 16:
+            fmt = struct.unpack_from('<HHIIHH', view, body)
+        elif chunk_id == b'data':
+            if fmt is None:
+                break
+            audio_format, channels, sample_rate, _, _, bits_per_sample = fmt
+            # Recorders that stream the file often leave the data size as a placeholder
+            data = view[body:min(body + chunk_size, len(view))]
+            return WavAudio(view, data, sample_rate, channels, bits_per_sample, audio_format)
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise HTTPException(status_code=400, detail="WAV file is missing its fmt or data chunk")
+
+
+def validate_wav(audio: WavAudio, max_seconds: float = MAX_AUDIO_SECONDS):
+    if not MIN_SAMPLE_RATE <= audio.sample_rate <= MAX_SAMPLE_RATE:
+        raise HTTPException(status_code=400, detail=f"Unsupported sample rate {audio.sample_rate} Hz")
+    if not 1 <= audio.channels <= MAX_CHANNELS:
+        raise HTTPException(status_code=400, detail=f"Unsupported channel count {audio.channels}")
+    if audio.audio_format not in PCM_FORMATS or audio.bits_per_sample != 16:
+        raise HTTPException(status_code=400, detail="Only 16-bit PCM WAV audio is supported")
+    if audio.duration > max_seconds:
+        raise HTTPException(status_code=413, detail=f"Audio is longer than {max_seconds:g} seconds")
+    return audio
+
+
+def frame_levels(mono, frame_length):
+    """
+    Level of each consecutive frame_length-sample frame of a float signal, in dBFS.
+    """
+    frames = mono[:len(mono) // frame_length * frame_length].reshape(-1, frame_length)
+    power = np.einsum('ij,ij->i', frames, frames) / (frame_length * 32768.0 ** 2)
+    return 10 * np.log10(power + 1e-12)
+
+
+def speech_frames(levels, frame_ms=VAD_FRAME_MS):
+    """
+    Returns (first, end) frame indices spanning the speech, or None if there is too little of it.
+    The threshold adapts to the recording: a margin above its noise floor (10th percentile level),
+    but never above a margin below its peak, so recordings without pauses are kept whole.
+    """
+    if not len(levels):
+        return None
+    threshold = max(VAD_MIN_DBFS, min(np.percentile(levels, 10) + VAD_MARGIN_DB, levels.max() - VAD_MARGIN_DB))
+    voiced = np.flatnonzero(levels > threshold)
+    if len(voiced) * frame_ms < VAD_MIN_SPEECH_MS:
+        return None
+    return voiced[0], voiced[-1] + 1
+
+
+def resample(samples, sample_rate, target_rate):
+    """
+    Downsamples float (frames, channels) audio: a moving average as the anti-aliasing filter, then
+    linear interpolation at the new sample positions.
+    """
+    ratio = sample_rate / target_rate
+    width = int(round(ratio))
+    if width > 1:
+        cumulative = np.cumsum(np.concatenate([np.zeros((1, samples.shape[1])), samples]), axis=0)
+        samples = (cumulative[width:] - cumulative[:-width]) / width
+    positions = np.arange(int(len(samples) / ratio)) * ratio
+    return np.stack([np.interp(positions, np.arange(len(samples)), samples[:, channel])
+                     for channel in range(samples.shape[1])], axis=1)
+
+
+def _speech_pcm(audio: WavAudio):
+    # Returns (pcm, sample_rate, channels): pcm is None when nothing changes and b"" when there is
+    # no speech. Nothing raised in here, so no array over the upload outlives the call.
+    channels, sample_rate = audio.channels, audio.sample_rate
+    samples = np.frombuffer(audio.data, dtype='<i2', count=len(audio.data) // (2 * channels) * channels)
+    samples = samples.reshape(-1, channels)
+
+    start, end = 0, len(samples)
+    if VAD_ENABLED:
+        frame_length = max(1, sample_rate * VAD_FRAME_MS // 1000)
+        # Summing channel columns is several times faster than mean(axis=1) over interleaved samples
+        mono = samples[:, 0].astype(np.float32)
+        for channel in range(1, channels):
+            mono += samples[:, channel]
+        mono /= channels
+        bounds = speech_frames(frame_levels(mono, frame_length))
+        if bounds is None:
+            return b"", sample_rate, channels
+        padding = sample_rate * VAD_PADDING_MS // 1000
+        start = max(0, bounds[0] * frame_length - padding)
+        end = min(len(samples), bounds[1] * frame_length + padding)
+
+    downmix = AUDIO_DOWNMIX and channels > 1
+    downsample = 0 < AUDIO_TARGET_SAMPLE_RATE < sample_rate
+    if (start, end) == (0, len(samples)) and not downmix and not downsample:
+        return None, sample_rate, channels
+    if not downmix and not downsample:
+        return samples[start:end].tobytes(), sample_rate, channels
+
+    speech = samples[start:end].astype(np.float32)
+    if downmix:
+        speech, channels = speech.mean(axis=1, keepdims=True), 1
+    if downsample:
+        speech, sample_rate = resample(speech, sample_rate, AUDIO_TARGET_SAMPLE_RATE), AUDIO_TARGET_SAMPLE_RATE
+    return np.clip(np.rint(speech), -32768, 32767).astype('<i2').tobytes(), sample_rate, channels
+
+
+def prepare_speech(audio: WavAudio):
+    """
+    Trims the silence before and after the speech in a validated upload and, if configured, mixes
+    it down to mono and downsamples it, so less audio is sent to (and billed by) the recognizer.
+    Returns the audio to recognize, which the caller must release(); the input is released when a
+    processed copy is returned. Raises 422 when the recording holds no speech.
+    """
+    original_seconds = audio.duration
+    pcm, sample_rate, channels = _speech_pcm(audio)
+    if pcm is None:
+        return audio
+    audio.release()
+    if not pcm:
+        raise HTTPException(status_code=422, detail="No speech was detected in the recording")
+    view = memoryview(pcm)
+    speech = WavAudio(view, view, sample_rate, channels, 16, audio.audio_format)
+    logger.debug("Prepared speech", extra={"original_seconds": round(original_seconds, 2),
+                                           "seconds": round(speech.duration, 2), "bytes": len(pcm)})
+    return speech
+
+
+def ingest_wav(file: UploadFile):
+    """
+    Reads, parses and validates an uploaded WAV. The caller must release() the result once the
+    samples have been handed to the recognizer.
+    """
+    view = read_upload(file)
+    try:
+        audio = parse_wav_header(view)
+    except HTTPException:
+        view.release()
+        raise
+    try:
+        return validate_wav(audio)
+    except HTTPException:
+        audio.release()
+        raise
@@ -0,0 +1,92 @@
+import os
+from datetime import date, timedelta
+
+from shared_store import shared_change_log
+from slot_index import SlotIndex, format_minute, to_end_minute, to_minute
+
+# Number of days from today that the prompt's availability summary covers
+AVAILABILITY_HORIZON_DAYS = int(os.getenv('AVAILABILITY_HORIZON_DAYS', '30'))
+# Most recent availability changes kept for other workers to apply; a worker further behind rebuilds
+# its summary from the database
+AVAILABILITY_CHANGE_LOG_SIZE = int(os.getenv('AVAILABILITY_CHANGE_LOG_SIZE', '1000'))
+
+
+def _mask(start_time_obj, end_time_obj):
+    start, end = to_minute(start_time_obj), to_end_minute(end_time_obj)
+    return ((1 << (end - start)) - 1) << start
+
+
+def free_runs(bits):
+    """
+    Yields (start_minute, end_minute) for every run of consecutive set bits, lowest first.
+    """
+    while bits:
+        start = (bits & -bits).bit_length() - 1
+        shifted = bits >> start
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        yield start, start + length
+        bits &= ~(((1 << length) - 1) << start)
+
+
+class AvailabilitySummary:
+    """
+    Per-day bitmap of free appointment time, one bit per minute of the day. Kept in sync with
+    time_slots on every create/delete/book/cancel, so the prompt never needs a full table scan.
+    `index` holds the same free slots (and the availability ranges) for next/nearest slot searches.
+    """
+
+    def __init__(self):
+        self._days = {}
+        self.index = SlotIndex()
+        # Version of availability_changes this summary reflects; every committed change bumps it
+        self.version = 0
+
+    def load(self, free_slots):
+        """
+        Replaces the summary with the given (date, start_time, end_time) rows of unbooked slots.
+        """
+        free_slots = list(free_slots)
+        self._days = {}
+        for date_obj, start_time_obj, end_time_obj in free_slots:
+            self._days[date_obj] = self._days.get(date_obj, 0) | _mask(start_time_obj, end_time_obj)
+        self.index.load_free(free_slots)
+
+    def replace(self, other):
+        """
+        Takes over the contents of a summary built elsewhere, e.g. off the event loop, in one step.
+        """
+        self._days, self.index = other._days, other.index
+
+    def mark_free(self, date_obj, start_time_obj, end_time_obj):
+        self._days[date_obj] = self._days.get(date_obj, 0) | _mask(start_time_obj, end_time_obj)
+        self.index.add_free(date_obj, start_time_obj, end_time_obj)
+
+    def mark_unavailable(self, date_obj, start_time_obj, end_time_obj):
+        self.index.remove_free(date_obj, start_time_obj, end_time_obj)
+        bits = self._days.get(date_obj, 0) & ~_mask(start_time_obj, end_time_obj)
+        if bits:
+            self._days[date_obj] = bits
+        else:
+            self._days.pop(date_obj, None)
+
+    def render(self, today=None, horizon_days=AVAILABILITY_HORIZON_DAYS):
+        """
+        Renders free time as one line per day with merged ranges, e.g.
+        "2024-03-15: 09:00-12:00, 14:00-16:30", for the days in [today, today + horizon_days).
+        """
+        today = today or date.today()
+        lines = []
+        for offset in range(horizon_days):
+            date_obj = today + timedelta(days=offset)
+            bits = self._days.get(date_obj)
+            if not bits:
+                continue
+            ranges = ", ".join(f"{format_minute(start)}-{format_minute(end)}" for start, end in free_runs(bits))
+            lines.append(f"{date_obj.isoformat()}: {ranges}")
+        return "\n".join(lines) if lines else "No available timeslots."
+
+
+availability = AvailabilitySummary()
+# Every committed change to time_slots and main_time_slots, so each worker can tell its summary is
+# stale and apply what it missed
+availability_changes = shared_change_log("availability:version", AVAILABILITY_CHANGE_LOG_SIZE)
@@ -0,0 +1,116 @@
+"""
+A burst of simultaneous /transcribe/ calls, with admission control off and on, while the Doctor
+page polls GET /timeslots/. Reports how many voice calls were served or turned away (429 when the
+queue was full, 503 when their wait ran out), the latency of the ones served, the most voice
+requests running at once, and the /timeslots/ latency during the burst.
+
+Run from the backend directory:
+    python -m benchmarks.bench_admission --burst 64 --max-in-flight 16 --max-queue 16
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.bench_e2e import percentiles
+from benchmarks.fakes import install_fakes, make_wav
+
+
+async def run(client, args, label):
+    import services
+    from admission import voice_admission
+
+    voice_admission.max_in_flight = args.max_in_flight if label == "on" else 0
+    voice_admission.max_queue = args.max_queue
+    voice_admission.queue_timeout = args.queue_timeout
+    audio = make_wav(seconds=args.audio_seconds)
+    statuses, served, admin = Counter(), [], []
+    running = peak = 0
+    converse = services.converse_with_voice_bot
+
+    async def counted(*call_args, **call_kwargs):
+        # Counts the voice requests that got past admission control and are being worked on
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await converse(*call_args, **call_kwargs)
+        finally:
+            running -= 1
+
+    async def caller(i):
+        session_id = (await client.post("/clear-history/")).json()["session_id"]
+        files = {"file": (f"{label}-{i}.wav", io.BytesIO(audio), "audio/wav")}
+        started = time.perf_counter()
+        response = await client.post("/transcribe/", files=files, data={"session_id": session_id})
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            served.append(time.perf_counter() - started)
+
+    async def doctor_page(done):
+        while not done.is_set():
+            started = time.perf_counter()
+            (await client.get("/timeslots/")).raise_for_status()
+            admin.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    services.converse_with_voice_bot = counted
+    done = asyncio.Event()
+    poller = asyncio.create_task(doctor_page(done))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(caller(i) for i in range(args.burst)))
+    finally:
+        services.converse_with_voice_bot = converse
+        done.set()
+        await poller
+    elapsed = time.perf_counter() - started
+    latency, admin_latency = percentiles(served), percentiles(admin)
+    print(f"{label:>9} {statuses[200]:>6} {statuses[429]:>5} {statuses[503]:>5} {peak:>5} {latency.get('p50', '-'):>8} "
+          f"{latency.get('p95', '-'):>8} {admin_latency.get('p95', '-'):>10} {elapsed:>7.1f}")
+
+
+async def main(args):
+    import migrations
+    from main import app
+    from sqlitedatabase import database
+
+    # The app's startup event, which would migrate, does not run here
+    migrations.migrate()
+    await database.connect()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        first_day = date.today() + timedelta(days=1)
+        time_slots = [{"date": (first_day + timedelta(days=day)).isoformat(), "start_time": "09:00",
+                       "end_time": "17:00"} for day in range(30)]
+        (await client.post("/timeslots/bulk/", json={"time_slots": time_slots})).raise_for_status()
+
+        print(f"{'admission':>9} {'served':>6} {'429':>5} {'503':>5} {'peak':>5} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'admin p95':>10} {'wall s':>7}")
+        await run(client, args, "off")
+        await run(client, args, "on")
+    await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=64)
+    # The defaults of VOICE_MAX_IN_FLIGHT (VOICE_PIPELINE_CONCURRENCY) and VOICE_MAX_QUEUE
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    parser.add_argument("--audio-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_admission_'), 'bench.db')}"
+    os.environ["TTS_PREWARM"] = "0"
+    install_fakes(stt_latency=0.3, llm_latency=0.4, tts_latency=0.2, stt_jitter=0.1, llm_jitter=0.1, tts_jitter=0.05)
+    asyncio.run(main(args))
@@ -0,0 +1,68 @@
+"""
+Microbenchmark of the /transcribe/ ingestion stage: the previous write-to-./tmp-and-read-back path
+against the in-memory path in audio_ingest (zero-copy view plus WAV header validation).
+
+Run from the backend directory:
+    python -m benchmarks.bench_audio_ingest --seconds 5 --iterations 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from starlette.datastructures import UploadFile
+
+from audio_ingest import ingest_wav
+from benchmarks.fakes import make_wav
+
+
+def upload(payload):
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(payload)
+    spooled.seek(0)
+    return UploadFile(spooled, size=len(payload), filename="user_audio.wav")
+
+
+def disk_path(file, tmp_dir):
+    # The ingestion steps converse_with_voice_bot used to perform before calling recognize
+    temp_file = os.path.join(tmp_dir, file.filename)
+    with open(temp_file, 'wb+') as f:
+        f.write(file.file.read())
+    with open(temp_file, "rb") as audio_file:
+        content = audio_file.read()
+    os.remove(temp_file)
+    return content
+
+
+def memory_path(file):
+    audio = ingest_wav(file)
+    content = audio.data.tobytes()
+    audio.release()
+    return content
+
+
+def measure(label, iterations, payload, run):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        file = upload(payload)
+        run(file)
+        file.file.close()
+    per_call = (time.perf_counter() - started) / iterations
+    print(f"{label:<14} {per_call * 1e6:9.1f}us per upload")
+    return per_call
+
+
+def main(args):
+    payload = make_wav(seconds=args.seconds)
+    print(f"payload: {len(payload)} bytes ({args.seconds:g}s of 16 kHz mono PCM)")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        disk = measure("disk round trip", args.iterations, payload, lambda file: disk_path(file, tmp_dir))
+    memory = measure("in-memory", args.iterations, payload, memory_path)
+    print(f"speed-up: {disk / memory:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
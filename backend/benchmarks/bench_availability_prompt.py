@@ -0,0 +1,87 @@
+"""
+Prompt size and build time of the availability section as the calendar grows: the previous
+full-table JSON dump against the incrementally maintained AvailabilitySummary.
+
+Run from the backend directory:
+    python -m benchmarks.bench_availability_prompt --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from databases import Database
+from sqlalchemy import create_engine
+
+import migrations
+from availability import AvailabilitySummary
+from schemas import TimeSlotModel
+
+SLOTS_PER_DAY = 20
+
+
+def seed(url, total_slots, rng):
+    first_day = date.today()
+    rows = []
+    for i in range(total_slots):
+        day = first_day + timedelta(days=i // SLOTS_PER_DAY)
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=30 * (i % SLOTS_PER_DAY))
+        rows.append({"date": day, "start_time": start.time(), "end_time": (start + timedelta(minutes=30)).time(),
+                     "is_booked": rng.random() < 0.3})
+    engine = create_engine(url)
+    migrations.migrate(engine)
+    with engine.begin() as connection:
+        connection.execute(TimeSlotModel.__table__.insert(), rows)
+    return rows
+
+
+async def legacy_prompt(database):
+    # What clear_history used to build for every new conversation
+    query = TimeSlotModel.__table__.select().where(TimeSlotModel.__table__.c.is_booked == False)
+    not_booked_slots = await database.fetch_all(query)
+    timeslots_info = [{"Date": slot["date"], "Start Time": slot["start_time"]} for slot in not_booked_slots]
+    return json.dumps(timeslots_info, default=str)
+
+
+async def measure(total_slots, directory, horizon_days, rng):
+    url = f"sqlite:///{os.path.join(directory, f'slots_{total_slots}.db')}"
+    rows = seed(url, total_slots, rng)
+    database = Database(url)
+    await database.connect()
+    started = time.perf_counter()
+    legacy = await legacy_prompt(database)
+    legacy_seconds = time.perf_counter() - started
+    await database.disconnect()
+
+    summary = AvailabilitySummary()
+    summary.load((row["date"], row["start_time"], row["end_time"]) for row in rows if not row["is_booked"])
+    started = time.perf_counter()
+    compact = summary.render(horizon_days=horizon_days)
+    render_seconds = time.perf_counter() - started
+    booking = rows[len(rows) // 2]
+    started = time.perf_counter()
+    summary.mark_unavailable(booking["date"], booking["start_time"], booking["end_time"])
+    update_seconds = time.perf_counter() - started
+
+    print(f"{total_slots:>8} {len(legacy):>12} {len(legacy) // 4:>10} {legacy_seconds * 1000:>10.1f} "
+          f"{len(compact):>12} {len(compact) // 4:>10} {render_seconds * 1000:>10.2f} {update_seconds * 1e6:>10.1f}")
+
+
+async def main(args):
+    rng = random.Random(3)
+    print(f"{'slots':>8} {'json chars':>12} {'~tokens':>10} {'build ms':>10} "
+          f"{'compact':>12} {'~tokens':>10} {'render ms':>10} {'update us':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for total_slots in args.sizes:
+            await measure(total_slots, directory, args.horizon_days, rng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--horizon-days", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
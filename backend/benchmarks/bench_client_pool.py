@@ -0,0 +1,77 @@
+"""
+Measures how much per-turn latency the pooled client registry saves over building a new
+Speech/TextToSpeech client (fresh gRPC channel and TLS handshake) on every request.
+
+Run from the backend directory:
+    python -m benchmarks.bench_client_pool --turns 50
+
+Both paths talk to a local TLS gRPC server, so the difference is channel setup alone.
+Requires cryptography (see benchmarks.fake_grpc).
+"""
+import argparse
+import statistics
+import time
+
+from google.cloud import speech
+from google.cloud import texttospeech
+
+from benchmarks.fake_grpc import FakeGoogleServer
+from clients import ClientRegistry
+
+
+def one_turn(speech_client, tts_client):
+    speech_client.recognize(config=speech.RecognitionConfig(language_code="en-US"),
+                            audio=speech.RecognitionAudio(content=b"\x00" * 1024))
+    tts_client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text="Your appointment is booked."),
+        voice=texttospeech.VoiceSelectionParams(language_code="en-US"),
+        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3),
+    )
+
+
+def per_request_clients(server, turns):
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        speech_client, tts_client = server.speech_client(), server.tts_client()
+        one_turn(speech_client, tts_client)
+        timings.append(time.perf_counter() - started)
+        speech_client.transport.close()
+        tts_client.transport.close()
+    return timings
+
+
+def pooled_clients(server, turns):
+    registry = ClientRegistry(speech_factory=server.speech_client, tts_factory=server.tts_client,
+                              openai_factory=None)
+    registry.start(warm_up=True)
+    print("registry setup (once per process): "
+          + ", ".join(f"{name}={seconds * 1000:.2f}ms" for name, seconds in registry.setup_seconds.items()))
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        one_turn(registry.speech, registry.tts)
+        timings.append(time.perf_counter() - started)
+    registry.close()
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<22} mean={statistics.mean(timings) * 1000:7.2f}ms "
+          f"p50={statistics.median(timings) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms")
+    return statistics.mean(timings)
+
+
+def main(args):
+    with FakeGoogleServer() as server:
+        fresh = report("new clients per turn", per_request_clients(server, args.turns))
+        pooled = report("pooled clients", pooled_clients(server, args.turns))
+    print(f"saved per turn: {(fresh - pooled) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    main(parser.parse_args())
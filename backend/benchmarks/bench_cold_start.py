@@ -0,0 +1,96 @@
+"""
+Cold start of the backend: how long `import main` takes in a fresh interpreter, how long the
+provider SDKs it no longer imports up front would add, and, for each CLIENT_STARTUP mode, the time
+from launching uvicorn to the first /healthz, GET /timeslots/ and /readyz responses (polled in that
+order).
+
+Every run uses a fresh SQLite database (migrated on startup), CLIENT_WARMUP=0 so no provider
+connection is attempted, and a placeholder OpenAI key. Without Google credentials the Speech and
+TTS clients fail to start after their SDKs are imported, which is recorded as before.
+
+Run from the backend directory:
+    python -m benchmarks.bench_cold_start --runs 3
+
+Requires httpx and uvicorn.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+MODES = ("blocking", "background", "lazy")
+SDKS = "import openai, grpc; from google.cloud import speech, texttospeech"
+
+
+def environment(directory):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}", TTS_PREWARM="0",
+               CLIENT_WARMUP="0", LOG_LEVEL="WARNING")
+    env.setdefault("OPENAI_API_KEY", "placeholder")
+    return env
+
+
+def import_seconds(statement, env):
+    code = f"import time; started = time.perf_counter(); {statement}; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for(client, path, started, timeout=60):
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not answer within {timeout}s")
+
+
+def cold_start(mode, env):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                              env=dict(env, CLIENT_STARTUP=mode), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            return {path: wait_for(client, path, started) for path in ("/healthz", "/timeslots/", "/readyz")}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        env = environment(directory)
+        imports = [import_seconds("import main", env) for _ in range(args.runs)]
+        sdks = [import_seconds(SDKS, env) for _ in range(args.runs)]
+        print(f"import main: {statistics.median(imports) * 1000:.0f} ms "
+              f"(provider SDKs, now imported when first needed: {statistics.median(sdks) * 1000:.0f} ms)")
+
+        print(f"{'CLIENT_STARTUP':<15} {'/healthz ms':>12} {'/timeslots/ ms':>15} {'/readyz ms':>11}")
+        for mode in MODES:
+            runs = []
+            for run in range(args.runs):
+                # A new database each time, so every start also creates the schema
+                run_env = dict(env, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'{mode}-{run}.db')}")
+                runs.append(cold_start(mode, run_env))
+            print(f"{mode:<15} " + " ".join(f"{statistics.median(run[path] for run in runs) * 1000:>{width}.0f}"
+                                             for path, width in (("/healthz", 12), ("/timeslots/", 15), ("/readyz", 11))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,52 @@
+"""
+Runs a long scripted json-mode conversation twice against the fake chat completions server: once
+sending the whole history every turn, once through the bounded context window, and reports the
+prompt tokens of each request and the total.
+
+Run from the backend directory:
+    python -m benchmarks.bench_context_window --turns 20
+"""
+import argparse
+import asyncio
+import json
+
+import services
+from benchmarks.fake_openai import FakeOpenAIServer, content_reply
+from clients import client_registry
+from context_window import context_window, prompt_tokens
+
+
+def script(turns):
+    # No booking is made, so the benchmark needs no database
+    return [content_reply(json.dumps({
+        "assistant_message_to_the_user": f"Sure, there are still openings around 10:00 tomorrow. Which one would you like? ({turn})",
+        "date": "2030-01-02", "time": "10:00", "name": "Ann" if turn > 2 else None,
+        "context": "The patient is comparing times before booking.", "action": "UNRELATED",
+    })) for turn in range(turns)]
+
+
+async def run(label, turns, token_budget, recent_turns):
+    context_window.token_budget = token_budget
+    context_window.recent_turns = recent_turns
+    with FakeOpenAIServer(script(turns), base_latency=0.0, per_token_latency=0.0) as server:
+        client_registry.close()
+        client_registry.factories["openai"] = server.client
+        session_id = (await services.clear_history())["session_id"]
+        for turn in range(turns):
+            await services.respond_to_transcription(f"What about a slightly different time? ({turn})", session_id)
+    sizes = [request["estimated"] for request in prompt_tokens.session(session_id)]
+    print(f"{label:<9} total={sum(sizes):>6} first={sizes[0]:>5} last={sizes[-1]:>5} per turn: "
+          + " ".join(str(size) for size in sizes))
+
+
+async def main(args):
+    await run("full", args.turns, 10 ** 9, 10 ** 9)
+    await run("windowed", args.turns, args.token_budget, args.recent_turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=4000)
+    parser.add_argument("--recent-turns", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Write throughput of the booking path on SQLite, with the connection defaults (rollback journal,
+synchronous=FULL) and with the tuned connections from sqlitedatabase (WAL, synchronous=NORMAL,
+busy_timeout). Concurrent patients book distinct slots while readers keep listing free slots, as
+the availability lookups do during a call.
+
+Run from the backend directory:
+    python -m benchmarks.bench_db_writes --bookings 500 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+import migrations
+import services
+from benchmarks.stress_booking import request, slot_date, slot_start
+from schemas import TimeSlotModel, UserAppointmentModel
+from sqlitedatabase import create_database, create_migration_engine
+
+
+async def fresh_database(url, tuned, slots):
+    # The tuned migration engine would switch the file to WAL, which persists across connections
+    engine = create_migration_engine(url) if tuned else create_engine(url)
+    migrations.migrate(engine)
+    engine.dispose()
+    database = create_database(url, tuned=tuned)
+    await database.connect()
+    await database.execute_many(TimeSlotModel.__table__.insert(), [
+        {"date": slot_date(i), "start_time": slot_start(i).time(),
+         "end_time": (slot_start(i) + services.SLOT_DURATION).time(), "is_booked": False}
+        for i in range(slots)
+    ])
+    services.database = database
+    return database
+
+
+async def run(label, url, tuned, args):
+    database = await fresh_database(url, tuned, args.bookings)
+    queue = list(range(args.bookings))
+    latencies, errors, reads = [], [], 0
+    writing = True
+
+    async def writer():
+        while queue:
+            i = queue.pop()
+            started = time.perf_counter()
+            try:
+                await services.book_appointment(*request(i, i))
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(e)
+
+    async def reader():
+        nonlocal reads
+        free_slots = TimeSlotModel.__table__
+        while writing:
+            try:
+                await database.fetch_all(free_slots.select().where(free_slots.c.is_booked == False).limit(50))  # noqa: E712
+                reads += 1
+            except Exception as e:
+                errors.append(e)
+
+    readers = [asyncio.ensure_future(reader()) for _ in range(args.readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(writer() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    writing = False
+    await asyncio.gather(*readers)
+    booked = await database.fetch_val(f"SELECT COUNT(*) FROM {UserAppointmentModel.__tablename__}")
+    await database.disconnect()
+    latencies.sort()
+    print(f"{label:<8} {booked / elapsed:>6.0f} bookings/s  {reads / elapsed:>6.0f} reads/s  "
+          f"p50={statistics.median(latencies) * 1000:.1f}ms p95={latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms  "
+          f"booked={booked}/{args.bookings} errors={len(errors)}"
+          + (f" ({errors[0]})" if errors else ""))
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        await run("default", f"sqlite:///{os.path.join(directory, 'default.db')}", False, args)
+        await run("tuned", f"sqlite:///{os.path.join(directory, 'tuned.db')}", True, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--directory", default=".", help="where the scratch databases are created (fsync cost depends on the disk)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,341 @@
+"""
+End-to-end load test of the voice API. Starts the app from main.py under uvicorn in this process,
+on a fresh SQLite database and with the fake STT/LLM/TTS backends from benchmarks.fakes (base
+latency plus exponential jitter). Simulated patients hold scripted booking conversations: a new
+session from /clear-history/, the greeting from /synthesize/, then four /transcribe/ turns that ask,
+book, reschedule and cancel, so the booking transactions run as well. Each concurrency level runs
+that many patients back to back for --duration seconds.
+
+Reported per level, as JSON: requests/s and turns/s, p50/p95/p99 of every pipeline stage (as
+timed by the app's own spans) and of every endpoint end to end (first byte and full response),
+with the commit the run was made on, so results can be kept and compared between commits.
+
+Run from the backend directory:
+    python -m benchmarks.bench_e2e --levels 1 4 16 --duration 20 --output e2e.json
+    python -m benchmarks.bench_e2e --streaming --compare e2e.json
+
+Requires httpx and uvicorn.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from benchmarks.fakes import FakeCompletions, FakeSpeechClient, install_fakes, make_wav
+
+GREETING = "Welcome to Dr. Walnut's Clinic! How can I help you today?"
+# Simulated patients per day of seeded availability; each one owns an hour from 09:00
+PATIENTS_PER_DAY = 8
+
+
+def percentiles(samples):
+    """
+    Summary of a list of durations in seconds, in milliseconds (nearest-rank percentiles).
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(q):
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))] * 1000, 1)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99), "max": round(ordered[-1] * 1000, 1)}
+
+
+class StageRecorder:
+    """
+    Stands in for observability.STAGE_SECONDS, keeping every observation per stage as well as
+    passing it on to the Prometheus histogram.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.samples = defaultdict(list)
+
+    def labels(self, stage):
+        return RecordedStage(self, stage)
+
+    def reset(self):
+        self.samples = defaultdict(list)
+
+
+class RecordedStage:
+    def __init__(self, recorder, stage):
+        self.recorder = recorder
+        self.stage = stage
+
+    def observe(self, seconds):
+        self.recorder.samples[self.stage].append(seconds)
+        self.recorder.histogram.labels(self.stage).observe(seconds)
+
+
+def conversation_script(patient, first_day):
+    """
+    (utterance, bot reply) per turn: ask, book, move half an hour later, cancel. Every patient owns
+    its own slots, so bookings never conflict and the cancel frees them for the next conversation.
+    """
+    name = f"Patient {patient}"
+    day = (first_day + timedelta(days=patient // PATIENTS_PER_DAY)).isoformat()
+    booked = f"{9 + patient % PATIENTS_PER_DAY:02d}:00"
+    moved = f"{9 + patient % PATIENTS_PER_DAY:02d}:30"
+
+    def reply(message, action=None, time_of_day=None):
+        return {"date": day if time_of_day else None, "time": time_of_day, "name": name if action else None,
+                "assistant_message_to_the_user": message, "context": "", "action": action}
+
+    return [
+        ("Hi, I'd like to book an appointment with the doctor.",
+         reply("Of course! Could I have your name, and which day and time would suit you?")),
+        (f"My name is {name}. Could I come in on {day} at {booked}?",
+         reply(f"You're booked for {day} at {booked}. Is there anything else I can help with?",
+               "SCHEDULE", booked)),
+        ("Something came up, can we make it half an hour later?",
+         reply(f"No problem, I've moved your appointment to {moved} on {day}.", "RESCHEDULE", moved)),
+        ("Actually, please cancel it. Sorry about that.",
+         reply("Your appointment has been cancelled. Have a nice day!", "CANCEL")),
+    ]
+
+
+class LoadRun:
+    """
+    Drives one concurrency level and collects client-side timings per endpoint.
+    """
+
+    def __init__(self, client, level, first_day):
+        self.client = client
+        self.level = level
+        self.first_day = first_day
+        self.audio = make_wav(seconds=1.5)
+        self.timings = defaultdict(list)
+        self.statuses = defaultdict(int)
+        self.conversations = 0
+        self.requests = 0
+
+    async def request(self, endpoint, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            async with self.client.stream(method, url, **kwargs) as response:
+                first_byte = None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    if first_byte is None:
+                        first_byte = time.perf_counter()
+                    body.extend(chunk)
+        except httpx.HTTPError as e:
+            self.statuses[type(e).__name__] += 1
+            return None
+        finished = time.perf_counter()
+        self.requests += 1
+        self.statuses[str(response.status_code)] += 1
+        if response.status_code != 200:
+            return None
+        self.timings[f"{endpoint}.first_byte"].append((first_byte or finished) - started)
+        self.timings[f"{endpoint}.total"].append(finished - started)
+        return bytes(body)
+
+    async def conversation(self, patient, number, session_id):
+        started = time.perf_counter()
+        body = await self.request("clear_history", "POST", "/clear-history/",
+                                  params={"session_id": session_id} if session_id else None)
+        if body is None:
+            return session_id
+        session_id = json.loads(body)["session_id"]
+        await self.request("synthesize", "POST", "/synthesize/", json={"text": GREETING})
+
+        for turn, (utterance, reply) in enumerate(conversation_script(patient, self.first_day)):
+            request_id = f"c{self.level}-p{patient}-n{number}-t{turn}"
+            FakeSpeechClient.utterances[request_id] = utterance
+            FakeCompletions.replies[request_id] = reply
+            files = {"file": (f"{request_id}.wav", io.BytesIO(self.audio), "audio/wav")}
+            try:
+                await self.request("transcribe", "POST", "/transcribe/", files=files,
+                                   data={"session_id": session_id}, headers={"X-Request-ID": request_id})
+            finally:
+                FakeSpeechClient.utterances.pop(request_id, None)
+                FakeCompletions.replies.pop(request_id, None)
+        self.timings["conversation"].append(time.perf_counter() - started)
+        self.conversations += 1
+        return session_id
+
+    async def patient(self, patient, deadline):
+        session_id, number = None, 0
+        while time.perf_counter() < deadline:
+            session_id = await self.conversation(patient, number, session_id)
+            number += 1
+
+    async def run(self, duration):
+        started = time.perf_counter()
+        await asyncio.gather(*(self.patient(patient, started + duration) for patient in range(self.level)))
+        return time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def seed_availability(client, first_day, patients):
+    days = -(-patients // PATIENTS_PER_DAY)
+    time_slots = [{"date": (first_day + timedelta(days=day)).isoformat(), "start_time": "09:00",
+                   "end_time": f"{9 + PATIENTS_PER_DAY:02d}:00"} for day in range(days)]
+    (await client.post("/timeslots/bulk/", json={"time_slots": time_slots})).raise_for_status()
+
+
+async def benchmark(args):
+    import uvicorn
+
+    import observability
+
+    recorder = StageRecorder(observability.STAGE_SECONDS)
+    observability.STAGE_SECONDS = recorder
+    # Started ahead of the app, which then keeps this destination
+    log_stream = open(args.log_file, "a")
+    observability.start_logging(stream=log_stream)
+
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=free_port(), log_level="warning"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+
+    first_day = date.today() + timedelta(days=1)
+    levels = []
+    limits = httpx.Limits(max_connections=max(args.levels) * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.config.port}", limits=limits,
+                                     timeout=120) as client:
+            await seed_availability(client, first_day, max(args.levels))
+            # One untimed conversation so first-use costs don't land in the lowest level
+            await LoadRun(client, 0, first_day).conversation(0, 0, None)
+
+            for level in args.levels:
+                recorder.reset()
+                run = LoadRun(client, level, first_day)
+                elapsed = await run.run(args.duration)
+                turns = len(run.timings["transcribe.total"])
+                result = {
+                    "concurrency": level,
+                    "seconds": round(elapsed, 2),
+                    "conversations": run.conversations,
+                    "requests": run.requests,
+                    "requests_per_second": round(run.requests / elapsed, 2),
+                    "turns_per_second": round(turns / elapsed, 2),
+                    "statuses": dict(run.statuses),
+                    "endpoints": {name: percentiles(samples) for name, samples in sorted(run.timings.items())},
+                    "stages": {stage: percentiles(samples) for stage, samples in sorted(recorder.samples.items())},
+                }
+                levels.append(result)
+                print_level(result)
+    finally:
+        server.should_exit = True
+        await serving
+        log_stream.close()
+    return levels
+
+
+def print_level(result):
+    print(f"\nconcurrency {result['concurrency']}: {result['requests_per_second']} req/s, "
+          f"{result['turns_per_second']} turns/s, statuses {result['statuses']}", file=sys.stderr)
+    print(f"  {'':<26} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    rows = [(f"stage {name}", summary) for name, summary in result["stages"].items()]
+    rows += [(name, summary) for name, summary in result["endpoints"].items()]
+    for name, summary in rows:
+        if summary["count"]:
+            print(f"  {name:<26} {summary['count']:>6} {summary['p50']:>9} {summary['p95']:>9} {summary['p99']:>9}",
+                  file=sys.stderr)
+
+
+def print_comparison(previous, current):
+    """
+    p95 of a full /transcribe/ turn and requests/s per level, against an earlier run's JSON.
+    """
+    earlier = {level["concurrency"]: level for level in previous["levels"]}
+    print(f"\nagainst {previous.get('commit')}:", file=sys.stderr)
+    for level in current["levels"]:
+        before = earlier.get(level["concurrency"])
+        if before is None:
+            continue
+        for label, old, new in [
+            ("transcribe p95 ms", before["endpoints"].get("transcribe.total", {}).get("p95"),
+             level["endpoints"].get("transcribe.total", {}).get("p95")),
+            ("requests/s", before["requests_per_second"], level["requests_per_second"]),
+        ]:
+            if old and new:
+                print(f"  concurrency {level['concurrency']:>3} {label:<18} {old:>9} -> {new:>9} "
+                      f"({(new - old) / old:+.1%})", file=sys.stderr)
+
+
+def main(args):
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    directory = tempfile.mkdtemp(prefix="bench_e2e_")
+    # Read by the app's modules at import, so set before main is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'e2e.db')}"
+    os.environ["TTS_PREWARM"] = "0"
+    os.environ["LLM_STREAMING"] = "1" if args.streaming else "0"
+    os.environ.pop("SHARED_STORE_URL", None)
+    install_fakes(args.stt_latency, args.llm_latency, args.tts_latency, stt_jitter=args.stt_jitter,
+                  llm_jitter=args.llm_jitter, tts_jitter=args.tts_jitter, llm_token_latency=args.llm_token_latency)
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    levels = asyncio.run(benchmark(args))
+    report = {
+        "benchmark": "e2e",
+        "commit": current_commit(),
+        "started_at": started_at,
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "log_file")},
+        "levels": levels,
+    }
+    if previous is not None:
+        print_comparison(previous, report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load per level")
+    parser.add_argument("--streaming", action="store_true", help="run with LLM_STREAMING=1")
+    parser.add_argument("--stt-latency", type=float, default=0.1)
+    parser.add_argument("--stt-jitter", type=float, default=0.03)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="time to the first token")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-token-latency", type=float, default=0.005)
+    parser.add_argument("--tts-latency", type=float, default=0.08)
+    parser.add_argument("--tts-jitter", type=float, default=0.03)
+    parser.add_argument("--output", help="JSON results file (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--log-file", default=os.devnull, help="where the app's JSON logs go")
+    main(parser.parse_args())
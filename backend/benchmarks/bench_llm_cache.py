@@ -0,0 +1,122 @@
+"""
+Upstream LLM calls and turn latency with the LLM response cache off and on. Patients arrive in
+bursts and open their calls the same way ("I'd like to book an appointment", with varying case and
+punctuation), ask what is free, and then either book a slot of their own (--book-fraction of them;
+every booking drops the cached replies) or hang up politely. Identical requests that are in flight
+at the same time are coalesced into one upstream call.
+
+Run from the backend directory:
+    python -m benchmarks.bench_llm_cache --patients 64 --concurrency 16
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks.bench_e2e import PATIENTS_PER_DAY, percentiles
+from benchmarks.fakes import FakeCompletions, FakeSpeechClient, install_fakes, make_wav
+
+OPENINGS = ["I'd like to book an appointment.", "I'd like to book an appointment", "i'd like to book an appointment",
+            "I'd like to book an appointment!"]
+
+
+def reply(message, action="UNRELATED", **fields):
+    return {"date": fields.get("date"), "time": fields.get("time"), "name": fields.get("name"),
+            "assistant_message_to_the_user": message, "context": "", "action": action}
+
+
+def script(patient, books, first_day):
+    day = (first_day + timedelta(days=patient // PATIENTS_PER_DAY)).isoformat()
+    start = f"{9 + patient % PATIENTS_PER_DAY:02d}:00"
+    last = (f"Please book me on {day} at {start}, my name is Patient {patient}.",
+            reply(f"You're booked for {day} at {start}.", "SCHEDULE", date=day, time=start, name=f"Patient {patient}")
+            ) if books else ("Thanks, I'll call back later.", reply("You're welcome, goodbye!"))
+    return [
+        (OPENINGS[patient % len(OPENINGS)], reply("Sure! Which day and time would suit you?")),
+        ("Which times are free?", reply("There are free slots every day this month between 09:00 and 17:00.")),
+        last,
+    ]
+
+
+async def run(client, args, label, first_day):
+    from llm_cache import llm_cache
+
+    llm_cache.max_entries = args.max_entries if label == "on" else 0
+    llm_cache.invalidate()
+    llm_cache.hits = llm_cache.coalesced = llm_cache.misses = 0
+    llm_cache.saved_seconds = 0.0
+    FakeCompletions.calls = 0
+    audio = make_wav(seconds=1.0)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    books_every = round(1 / args.book_fraction) if args.book_fraction else 0
+
+    async def patient(i):
+        async with semaphore:
+            session_id = (await client.post("/clear-history/")).json()["session_id"]
+            books = bool(books_every) and i % books_every == books_every - 1
+            for turn, (utterance, bot_reply) in enumerate(script(i, books, first_day)):
+                request_id = f"{label}-{i}-{turn}"
+                FakeSpeechClient.utterances[request_id] = utterance
+                FakeCompletions.replies[request_id] = bot_reply
+                files = {"file": (f"{request_id}.wav", io.BytesIO(audio), "audio/wav")}
+                started = time.perf_counter()
+                response = await client.post("/transcribe/", files=files, data={"session_id": session_id},
+                                             headers={"X-Request-ID": request_id})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(patient(i) for i in range(args.patients)))
+    elapsed = time.perf_counter() - started
+    stats = llm_cache.stats()
+    turn = percentiles(latencies)
+    print(f"{label:>5} {len(latencies):>6} {FakeCompletions.calls:>9} {stats['hits']:>5} {stats['coalesced']:>9} "
+          f"{stats['hit_rate']:>8.1%} {stats['saved_seconds']:>8.1f} {turn['p50']:>8} {turn['p95']:>8} {elapsed:>8.1f}")
+
+
+async def main(args):
+    import migrations
+    from main import app
+    from sqlitedatabase import database
+
+    # The app's startup event, which would migrate, does not run here
+    migrations.migrate()
+    await database.connect()
+    first_day = date.today() + timedelta(days=1)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        days = 2 * -(-args.patients // PATIENTS_PER_DAY)
+        time_slots = [{"date": (first_day + timedelta(days=day)).isoformat(), "start_time": "09:00",
+                       "end_time": "17:00"} for day in range(days)]
+        (await client.post("/timeslots/bulk/", json={"time_slots": time_slots})).raise_for_status()
+
+        print(f"{'cache':>5} {'turns':>6} {'upstream':>9} {'hits':>5} {'coalesced':>9} {'hit rate':>8} "
+              f"{'saved s':>8} {'p50 ms':>8} {'p95 ms':>8} {'wall s':>8}")
+        await run(client, args, "off", first_day)
+        # The second run books on later days, so its slots are all free
+        await run(client, args, "on", first_day + timedelta(days=days // 2))
+    await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--book-fraction", type=float, default=0.25)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_llm_cache_'), 'bench.db')}"
+    os.environ["TTS_PREWARM"] = "0"
+    install_fakes(stt_latency=0.02, llm_latency=args.llm_latency, tts_latency=0.02, llm_jitter=args.llm_jitter)
+    asyncio.run(main(args))
@@ -0,0 +1,76 @@
+"""
+Measures time to first audio for one bot turn with and without LLM_STREAMING, against the local fake
+chat completions server generating tokens at a fixed rate and the fake TTS client.
+
+Reports, from the moment the transcription is handed to the bot:
+    first token     first content delta from the model (streaming only)
+    first sentence  first complete sentence of assistant_message_to_the_user (streaming only)
+    first audio     first MP3 bytes ready to send to the caller
+    done            reply fully generated and its action carried out
+
+Run from the backend directory:
+    python -m benchmarks.bench_llm_streaming --turns 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import services
+from benchmarks.fake_openai import FakeOpenAIServer, content_reply
+from benchmarks.fakes import install_fakes
+from clients import client_registry
+
+MESSAGE = ("Sure, I can help you book an appointment with Dr. Walnut. Tomorrow there are openings at "
+           "10:00, 10:30 and 14:00. Which of those times works best for you? Once you pick one, "
+           "I will also need your full name to complete the booking.")
+
+
+def reply():
+    return content_reply(json.dumps({
+        "assistant_message_to_the_user": MESSAGE, "date": None, "time": None, "name": None,
+        "context": "The patient wants to book an appointment tomorrow and has not chosen a time yet.",
+        "action": "UNRELATED",
+    }))
+
+
+async def turn(streaming, session_id):
+    timings = {}
+    started = time.perf_counter()
+    if streaming:
+        audio, reply_task = services.start_streaming_reply("I'd like to book an appointment tomorrow", session_id, timings)
+    else:
+        text = await services.respond_to_transcription("I'd like to book an appointment tomorrow", session_id)
+        audio, reply_task = services.text_to_speech(text), None
+    async for _ in audio:
+        timings.setdefault("first_audio", time.perf_counter())
+    if reply_task is not None:
+        await reply_task
+    timings["done"] = time.perf_counter()
+    return {stage: (moment - started) * 1000 for stage, moment in timings.items()}
+
+
+async def main(args):
+    install_fakes(tts_latency=args.tts_latency)
+    session_id = (await services.clear_history())["session_id"]
+    script = [reply() for _ in range(2 * args.turns)]
+    with FakeOpenAIServer(script, args.base_latency, output_token_latency=args.output_token_latency) as server:
+        client_registry.close()
+        client_registry.factories["openai"] = server.client
+        for streaming in (False, True):
+            results = [await turn(streaming, session_id) for _ in range(args.turns)]
+            columns = ", ".join(
+                f"{stage}={statistics.median(result[stage] for result in results):.0f}ms"
+                for stage in ("first_token", "first_sentence", "first_audio", "done") if stage in results[0]
+            )
+            print(f"{'streaming' if streaming else 'blocking':<9} {columns}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--base-latency", type=float, default=0.3)
+    parser.add_argument("--output-token-latency", type=float, default=0.02)
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,140 @@
+"""
+Voice turns (/transcribe/: STT, LLM and TTS) against fakes with injected faults, with the
+resilience layer off (one attempt, no hedging, no circuit breaker, no deadline) and on. Scenarios:
+
+  tail    a few calls to every provider stall for several seconds
+  errors  every provider fails a share of its calls with a 503
+  outage  the LLM fails every call during the middle third of the run
+
+Reported per run: turns, failed turns (HTTP errors), p50/p95/p99 turn latency, and per provider
+the retries, hedges sent/won, calls that failed, and calls rejected by an open circuit.
+
+Run from the backend directory:
+    python -m benchmarks.bench_resilience --turns 200 --concurrency 8
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.bench_e2e import percentiles
+from benchmarks.fakes import (DEFAULT_BOT_REPLY, FakeCompletions, FakeSpeechClient, FakeTextToSpeechClient, Faults,
+                              install_fakes, make_wav)
+
+SCENARIOS = {
+    "tail": lambda args: dict(stt=Faults(slow_rate=args.slow_rate, slow_latency=args.slow_latency),
+                              llm=Faults(slow_rate=args.slow_rate, slow_latency=args.slow_latency),
+                              tts=Faults(slow_rate=args.slow_rate, slow_latency=args.slow_latency)),
+    "errors": lambda args: dict(stt=Faults(error_rate=args.error_rate), llm=Faults(error_rate=args.error_rate),
+                                tts=Faults(error_rate=args.error_rate)),
+    "outage": lambda args: dict(stt=Faults(), llm=Faults(), tts=Faults()),
+}
+
+
+def configure(resilient, args):
+    import resilience
+
+    deadlines = {"stt": resilience.STT_DEADLINE_SECONDS, "llm": resilience.LLM_DEADLINE_SECONDS,
+                 "tts": resilience.TTS_DEADLINE_SECONDS}
+    for policy in resilience.upstream_policies:
+        policy.deadline = deadlines[policy.name] if resilient else 600.0
+        policy.retries = resilience.UPSTREAM_RETRIES if resilient else 0
+        policy.hedge_percentile = resilience.HEDGE_PERCENTILE if resilient else 0
+        policy.breaker = resilience.CircuitBreaker(policy.name, resilience.CIRCUIT_FAILURES if resilient else 10 ** 9,
+                                                   args.open_seconds)
+        policy.outcomes = dict.fromkeys(policy.outcomes, 0)
+        policy.retried = policy.hedges = policy.hedges_won = 0
+    return resilience.upstream_policies
+
+
+async def run(client, args, scenario, resilient):
+    policies = configure(resilient, args)
+    faults = SCENARIOS[scenario](args)
+    FakeSpeechClient.faults, FakeCompletions.faults, FakeTextToSpeechClient.faults = (
+        faults["stt"], faults["llm"], faults["tts"])
+    audio = make_wav(seconds=1.0)
+    statuses, latencies = Counter(), []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+
+    async def turn(i):
+        async with semaphore:
+            if scenario == "outage":
+                # The LLM is down while the middle third of the turns start
+                faults["llm"].outage = args.turns // 3 <= i < 2 * args.turns // 3
+            request_id = f"{scenario}-{resilient}-{i}"
+            # A different sentence every turn, so TTS is called instead of answered from the cache
+            FakeCompletions.replies[request_id] = dict(DEFAULT_BOT_REPLY,
+                                                       assistant_message_to_the_user=f"Turn {request_id} is noted.")
+            session_id = (await client.post("/clear-history/")).json()["session_id"]
+            files = {"file": (f"{request_id}.wav", io.BytesIO(audio), "audio/wav")}
+            turn_started = time.perf_counter()
+            try:
+                response = await client.post("/transcribe/", files=files, data={"session_id": session_id},
+                                             headers={"X-Request-ID": request_id})
+                statuses[response.status_code] += 1
+            except Exception:
+                # The reply audio failed part way through
+                statuses["stream error"] += 1
+            latencies.append(time.perf_counter() - turn_started)
+
+    await asyncio.gather(*(turn(i) for i in range(args.turns)))
+    elapsed = time.perf_counter() - started
+    failed = sum(count for status, count in statuses.items() if status != 200)
+    latency = percentiles(latencies)
+    providers = " ".join(f"{policy.name}:{policy.retried}/{policy.hedges}/{policy.hedges_won}/"
+                         f"{policy.outcomes['failed']}/{policy.outcomes['rejected']}" for policy in policies)
+    print(f"{scenario:<7} {'on' if resilient else 'off':<4} {args.turns:>5} {failed:>6} {latency['p50']:>8} "
+          f"{latency['p95']:>8} {latency['p99']:>8} {elapsed:>6.1f}  {providers}")
+
+
+async def main(args):
+    import migrations
+    from admission import voice_admission
+    from main import app
+    from services import TTS_ENCODING, TTS_FALLBACK_PHRASE, TTS_VOICE
+    from sqlitedatabase import database
+    from llm_cache import llm_cache
+    from tts_cache import tts_cache
+
+    # Every turn goes to the LLM
+    llm_cache.max_entries = 0
+    # Only the fallback phrase is cached; every other sentence is synthesized
+    tts_cache.directory = None
+    tts_cache.put(TTS_FALLBACK_PHRASE, TTS_VOICE, TTS_ENCODING, b"\xff\xfb\x90\x00" * 64)
+    voice_admission.max_in_flight = 0
+    migrations.migrate()
+    await database.connect()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        print(f"{'faults':<7} {'res.':<4} {'turns':>5} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'wall s':>6}  provider:retries/hedges/hedges won/failed/rejected")
+        for scenario in args.scenarios:
+            for resilient in (False, True):
+                await run(client, args, scenario, resilient)
+    await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["tail", "errors", "outage"])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-latency", type=float, default=4.0)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_resilience_'), 'bench.db')}"
+    os.environ["TTS_PREWARM"] = "0"
+    install_fakes(stt_latency=0.1, llm_latency=0.2, tts_latency=0.05, stt_jitter=0.02, llm_jitter=0.05,
+                  tts_jitter=0.01, tts_cache_enabled=True)
+    asyncio.run(main(args))
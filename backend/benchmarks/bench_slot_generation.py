@@ -0,0 +1,78 @@
+"""
+Loads a month of clinic availability two ways against a scratch SQLite database: the previous
+one-INSERT-per-slot loop without a transaction, and services.create_time_slots_bulk.
+
+Run from the backend directory:
+    python -m benchmarks.bench_slot_generation --days 30
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from databases import Database
+from sqlalchemy import create_engine
+
+import models
+import services
+from schemas import MainTimeSlotModel, TimeSlotModel
+from sqlitedatabase import Base
+
+
+async def legacy_load(database, days):
+    # Mirrors the per-interval loop create_time_slot used before batching
+    for date_obj, start_time_obj, end_time_obj in days:
+        await database.execute(MainTimeSlotModel.__table__.insert().values(
+            date=date_obj, start_time=start_time_obj, end_time=end_time_obj))
+        current_slot_start = datetime.combine(date_obj, start_time_obj)
+        end_datetime = datetime.combine(date_obj, end_time_obj)
+        while current_slot_start + timedelta(minutes=30) <= end_datetime:
+            current_slot_end = current_slot_start + timedelta(minutes=30)
+            await database.execute(TimeSlotModel.__table__.insert().values(
+                date=date_obj, start_time=current_slot_start.time(), end_time=current_slot_end.time(),
+                is_booked=False))
+            current_slot_start = current_slot_end
+
+
+async def bulk_load(database, days):
+    services.database = database
+    await services.create_time_slots_bulk(models.BulkTimeSlotRequest(time_slots=[
+        models.MainTimeSlot(date=date_obj.isoformat(), start_time=start_time_obj.strftime("%H:%M"),
+                            end_time=end_time_obj.strftime("%H:%M"))
+        for date_obj, start_time_obj, end_time_obj in days
+    ]))
+
+
+async def timed(label, loader, days, directory):
+    url = f"sqlite:///{os.path.join(directory, label.replace(' ', '_'))}.db"
+    Base.metadata.create_all(bind=create_engine(url))
+    database = Database(url)
+    await database.connect()
+    started = time.perf_counter()
+    await loader(database, days)
+    elapsed = time.perf_counter() - started
+    slots = await database.fetch_val("SELECT COUNT(*) FROM time_slots")
+    await database.disconnect()
+    print(f"{label:<16} {elapsed * 1000:9.1f}ms for {slots} slots")
+    return elapsed
+
+
+async def main(args):
+    first_day = date(2030, 1, 1)
+    opening = datetime.strptime(args.opening, "%H:%M").time()
+    closing = datetime.strptime(args.closing, "%H:%M").time()
+    days = [(first_day + timedelta(days=i), opening, closing) for i in range(args.days)]
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = await timed("per-row inserts", legacy_load, days, directory)
+        bulk = await timed("bulk", bulk_load, days, directory)
+    print(f"speed-up: {legacy / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--opening", default="08:00")
+    parser.add_argument("--closing", default="18:00")
+    asyncio.run(main(parser.parse_args()))
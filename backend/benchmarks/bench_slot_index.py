@@ -0,0 +1,138 @@
+"""
+Seeds a scratch SQLite database (with the migrations' indexes) with 100k free slots and compares
+the SQL queries for range overlap checks and next/nearest free slot searches against the in-memory
+SlotIndex that now answers them. Also reports how long loading the index takes at startup.
+
+Run from the backend directory:
+    python -m benchmarks.bench_slot_index --slots 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, create_engine, or_, select
+
+import migrations
+from schemas import MainTimeSlotModel, TimeSlotModel
+from slot_index import SlotIndex, to_minute
+from sqlitedatabase import Base
+
+SLOTS_PER_DAY = 16
+LIMIT = 5
+
+
+def seed(engine, total_slots, rng):
+    first_day = date(2030, 1, 1)
+    slots, main_slots = [], []
+    for i in range(total_slots // SLOTS_PER_DAY):
+        day = first_day + timedelta(days=i)
+        main_slots.append({"date": day, "start_time": datetime(2030, 1, 1, 9).time(),
+                           "end_time": datetime(2030, 1, 1, 17).time()})
+        start = datetime.combine(day, datetime(2030, 1, 1, 9).time())
+        for j in range(SLOTS_PER_DAY):
+            slot_start = start + timedelta(minutes=30 * j)
+            slots.append({"date": day, "start_time": slot_start.time(),
+                          "end_time": (slot_start + timedelta(minutes=30)).time(),
+                          "is_booked": rng.random() < 0.7})
+    with engine.begin() as connection:
+        connection.execute(MainTimeSlotModel.__table__.insert(), main_slots)
+        connection.execute(TimeSlotModel.__table__.insert(), slots)
+    return first_day, len(main_slots)
+
+
+def load_index(connection):
+    time_slots, main_time_slots = TimeSlotModel.__table__, MainTimeSlotModel.__table__
+    index = SlotIndex()
+    index.load_free(connection.execute(select(time_slots.c.date, time_slots.c.start_time, time_slots.c.end_time)
+                                       .where(time_slots.c.is_booked == False)).fetchall())
+    index.load_ranges(connection.execute(select(main_time_slots.c.date, main_time_slots.c.start_time,
+                                                main_time_slots.c.end_time)).fetchall())
+    return index
+
+
+def sql_overlap(connection, day, start, end):
+    main_time_slots = MainTimeSlotModel.__table__
+    return connection.execute(select(main_time_slots).where(
+        main_time_slots.c.date == day, main_time_slots.c.start_time < end, main_time_slots.c.end_time > start
+    ).limit(1)).first()
+
+
+def sql_next(connection, day, start):
+    time_slots = TimeSlotModel.__table__
+    return connection.execute(select(time_slots.c.date, time_slots.c.start_time, time_slots.c.end_time).where(
+        or_(time_slots.c.date > day, and_(time_slots.c.date == day, time_slots.c.start_time >= start)),
+        time_slots.c.is_booked == False
+    ).order_by(time_slots.c.date, time_slots.c.start_time).limit(LIMIT)).fetchall()
+
+
+def sql_nearest(connection, day, start):
+    # The LIMIT slots on either side of the target, merged by distance
+    time_slots = TimeSlotModel.__table__
+    columns = (time_slots.c.date, time_slots.c.start_time, time_slots.c.end_time)
+    earlier = connection.execute(select(*columns).where(
+        or_(time_slots.c.date < day, and_(time_slots.c.date == day, time_slots.c.start_time < start)),
+        time_slots.c.is_booked == False
+    ).order_by(time_slots.c.date.desc(), time_slots.c.start_time.desc()).limit(LIMIT)).fetchall()
+    target = datetime.combine(day, start)
+    return sorted(sql_next(connection, day, start) + earlier,
+                  key=lambda row: abs((datetime.combine(row[0], row[1]) - target).total_seconds()))[:LIMIT]
+
+
+def measure(cases, repetitions, rng, first_day, days):
+    results = {}
+    for label, run in cases.items():
+        timings = []
+        for _ in range(repetitions):
+            day = first_day + timedelta(days=rng.randrange(days))
+            start = datetime(2030, 1, 1, rng.randrange(8, 18), rng.choice((0, 15, 30, 45))).time()
+            started = time.perf_counter()
+            run(day, start)
+            timings.append(time.perf_counter() - started)
+        results[label] = statistics.median(timings)
+    return results
+
+
+def main(args):
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        migrations.migrate(engine)
+        started = time.perf_counter()
+        first_day, days = seed(engine, args.slots, rng)
+        print(f"seeded {days * SLOTS_PER_DAY} slots over {days} days in {time.perf_counter() - started:.1f}s")
+
+        with engine.connect() as connection:
+            started = time.perf_counter()
+            index = load_index(connection)
+            print(f"loaded the index ({index.stats()}) in {time.perf_counter() - started:.2f}s")
+
+            def end_of(start):
+                return (datetime.combine(first_day, start) + timedelta(hours=1)).time()
+
+            sql = measure({
+                "overlap check": lambda day, start: sql_overlap(connection, day, start, end_of(start)),
+                "next 5 free": lambda day, start: sql_next(connection, day, start),
+                "nearest 5 free": lambda day, start: sql_nearest(connection, day, start),
+            }, args.repetitions, rng, first_day, days)
+            in_memory = measure({
+                "overlap check": lambda day, start: index.overlap(day, start, end_of(start)),
+                "next 5 free": lambda day, start: index.next_free(day, to_minute(start), LIMIT),
+                "nearest 5 free": lambda day, start: index.nearest_free(day, to_minute(start), LIMIT),
+            }, args.repetitions, rng, first_day, days)
+
+    print(f"{'lookup':<16} {'SQL (ms)':>9} {'index (ms)':>11} {'speed-up':>9}")
+    for label in sql:
+        print(f"{label:<16} {sql[label] * 1000:>9.3f} {in_memory[label] * 1000:>11.4f} "
+              f"{sql[label] / in_memory[label]:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=100000)
+    parser.add_argument("--repetitions", type=int, default=500)
+    main(parser.parse_args())
@@ -0,0 +1,124 @@
+"""
+Seeds a scratch SQLite database with 100k bookable slots and measures the availability queries
+services.py issues, first without the composite/partial indexes and then after migrations.migrate.
+
+Run from the backend directory:
+    python -m benchmarks.bench_slot_indexes --slots 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, select, func, text
+
+import migrations
+from schemas import MainTimeSlotModel, TimeSlotModel, UserAppointmentModel
+from sqlitedatabase import Base
+
+NEW_INDEXES = [
+    "ix_time_slots_date_start_end_booked",
+    "ix_time_slots_unbooked_date",
+    "ix_main_time_slots_date_start",
+    "ix_user_appointments_timeslot_id",
+]
+SLOTS_PER_DAY = 20
+
+
+def seed(engine, total_slots, rng):
+    first_day = date(2030, 1, 1)
+    slots, main_slots = [], []
+    for i in range(total_slots // SLOTS_PER_DAY):
+        day = first_day + timedelta(days=i)
+        main_slots.append({"date": day, "start_time": datetime(2030, 1, 1, 8).time(),
+                           "end_time": datetime(2030, 1, 1, 18).time()})
+        start = datetime.combine(day, datetime(2030, 1, 1, 8).time())
+        for j in range(SLOTS_PER_DAY):
+            slot_start = start + timedelta(minutes=30 * j)
+            slots.append({"date": day, "start_time": slot_start.time(),
+                          "end_time": (slot_start + timedelta(minutes=30)).time(),
+                          "is_booked": rng.random() < 0.3})
+    with engine.begin() as connection:
+        connection.execute(MainTimeSlotModel.__table__.insert(), main_slots)
+        connection.execute(TimeSlotModel.__table__.insert(), slots)
+        booked_ids = [row[0] for row in connection.execute(
+            select(TimeSlotModel.id).where(TimeSlotModel.is_booked == True))]
+        connection.execute(UserAppointmentModel.__table__.insert(), [
+            {"user_name": f"patient-{slot_id}", "timeslot_id": slot_id} for slot_id in booked_ids
+        ])
+    return first_day, len(main_slots)
+
+
+def queries(first_day, days, rng):
+    def some_day():
+        return first_day + timedelta(days=rng.randrange(days))
+
+    nine, half_past = datetime(2030, 1, 1, 9).time(), datetime(2030, 1, 1, 9, 30).time()
+    return {
+        # book_appointment: find the exact open slot
+        "book lookup": lambda: select(TimeSlotModel.__table__).where(
+            TimeSlotModel.date == some_day(), TimeSlotModel.start_time == nine,
+            TimeSlotModel.end_time == half_past, TimeSlotModel.is_booked == False),
+        # delete_time_slot: interval slots inside a main range
+        "delete range scan": lambda: select(func.count()).select_from(TimeSlotModel.__table__).where(
+            TimeSlotModel.date == some_day(), TimeSlotModel.start_time >= nine,
+            TimeSlotModel.end_time <= datetime(2030, 1, 1, 12).time()),
+        # availability for one day, unbooked only
+        "open slots by day": lambda: select(TimeSlotModel.date, TimeSlotModel.start_time).where(
+            TimeSlotModel.date == some_day(), TimeSlotModel.is_booked == False
+        ).order_by(TimeSlotModel.start_time),
+        # delete_appointment -> free the slot the appointment points at
+        "appointments by slot": lambda: select(UserAppointmentModel.__table__).where(
+            UserAppointmentModel.timeslot_id == rng.randrange(1, days * SLOTS_PER_DAY)),
+        # create_time_slot overlap check
+        "main slots by day": lambda: select(MainTimeSlotModel.__table__).where(
+            MainTimeSlotModel.date == some_day()),
+    }
+
+
+def measure(engine, query_builders, repetitions):
+    results = {}
+    with engine.connect() as connection:
+        for label, build in query_builders.items():
+            timings = []
+            for _ in range(repetitions):
+                query = build()
+                started = time.perf_counter()
+                connection.execute(query).fetchall()
+                timings.append(time.perf_counter() - started)
+            results[label] = statistics.median(timings)
+    return results
+
+
+def main(args):
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            for name in NEW_INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        started = time.perf_counter()
+        first_day, days = seed(engine, args.slots, rng)
+        print(f"seeded {days * SLOTS_PER_DAY} slots over {days} days in {time.perf_counter() - started:.1f}s")
+
+        before = measure(engine, queries(first_day, days, rng), args.repetitions)
+        started = time.perf_counter()
+        migrations.migrate(engine)
+        print(f"migration took {time.perf_counter() - started:.2f}s")
+        after = measure(engine, queries(first_day, days, rng), args.repetitions)
+
+    print(f"{'query':<22} {'before (ms)':>12} {'after (ms)':>11} {'speed-up':>9}")
+    for label in before:
+        print(f"{label:<22} {before[label] * 1000:>12.3f} {after[label] * 1000:>11.3f} "
+              f"{before[label] / after[label]:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=100000)
+    parser.add_argument("--repetitions", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""
+Compares the delay between the patient finishing an utterance and the bot's reply audio for the
+batch /transcribe/ upload and the /ws/transcribe/ streaming endpoint, using fake backends.
+
+Run from the backend directory:
+    python -m benchmarks.bench_streaming_stt --utterances 5
+
+Both paths share the fake LLM and TTS latency; the streaming path only pays the recognizer's
+finalization delay after the last chunk instead of a full batch recognition.
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+import streaming_stt
+from benchmarks.fakes import FakeStreamingRecognizer, install_fakes, make_wav
+
+CHUNK = b"\x1a\x45\xdf\xa3" + b"\x00" * 4092
+
+
+def batch_turn(client, session_id, chunks):
+    audio = make_wav(seconds=chunks * 0.25)
+    stopped = time.perf_counter()
+    response = client.post("/transcribe/", files={"file": ("user_audio.wav", audio, "audio/wav")},
+                           data={"session_id": session_id})
+    response.raise_for_status()
+    return time.perf_counter() - stopped
+
+
+def streaming_turn(client, session_id, chunks):
+    with client.websocket_connect(f"/ws/transcribe/?session_id={session_id}") as websocket:
+        for _ in range(chunks):
+            websocket.send_bytes(CHUNK)
+            websocket.receive_json()
+        stopped = time.perf_counter()
+        websocket.send_text("stop")
+        while websocket.receive_json()["type"] != "reply":
+            pass
+        websocket.receive_bytes()
+        return time.perf_counter() - stopped
+
+
+def main(args):
+    install_fakes(args.stt_latency, args.llm_latency, args.tts_latency)
+    streaming_stt.set_recognizer(FakeStreamingRecognizer(finalize_latency=args.finalize_latency))
+    from main import app
+
+    with TestClient(app) as client:
+        results = {}
+        for label, turn in (("batch upload", batch_turn), ("websocket stream", streaming_turn)):
+            timings = []
+            for _ in range(args.utterances):
+                session_id = client.post("/clear-history/").json()["session_id"]
+                timings.append(turn(client, session_id, args.chunks))
+            results[label] = statistics.median(timings)
+            print(f"{label:<18} end-of-speech to reply audio: p50={results[label] * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=10)
+    parser.add_argument("--stt-latency", type=float, default=0.5)
+    parser.add_argument("--finalize-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--tts-latency", type=float, default=0.1)
+    main(parser.parse_args())
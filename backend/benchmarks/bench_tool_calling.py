@@ -0,0 +1,96 @@
+"""
+Runs the same two-turn booking conversation in "json" mode (availability embedded in the prompt)
+and "tools" mode (model calls find_available_slots/book) against the scripted fake chat
+completions server, and reports prompt tokens and per-turn latency.
+
+Run from the backend directory:
+    python -m benchmarks.bench_tool_calling --days 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from databases import Database
+from sqlalchemy import create_engine
+
+import bot_tools
+import migrations
+import services
+from benchmarks.fake_openai import FakeOpenAIServer, content_reply, tool_call_reply
+from clients import client_registry
+from schemas import TimeSlotModel
+
+SLOTS_PER_DAY = 20
+
+
+def json_reply(message, action="SCHEDULE", name=None, day=None, time_of_day=None):
+    return content_reply(json.dumps({"date": day, "time": time_of_day, "name": name, "context": "",
+                                     "assistant_message_to_the_user": message, "action": action}))
+
+
+def script(mode, day):
+    if mode == "json":
+        return [
+            json_reply("10:00 is available. May I have your name?", day=day, time_of_day="10:00"),
+            json_reply("Thanks Ann, you are booked.", name="Ann", day=day, time_of_day="10:00"),
+        ]
+    return [
+        tool_call_reply("find_available_slots", date=day, near_time="10:00"),
+        content_reply("10:00 is available. May I have your name?"),
+        tool_call_reply("book", name="Ann", date=day, time="10:00"),
+        content_reply("Thanks Ann, you are booked."),
+    ]
+
+
+async def seed(directory, name, days):
+    url = f"sqlite:///{os.path.join(directory, name)}.db"
+    migrations.migrate(create_engine(url))
+    database = Database(url)
+    await database.connect()
+    first_day = date.today() + timedelta(days=1)
+    await database.execute_many(TimeSlotModel.__table__.insert(), [
+        {"date": first_day + timedelta(days=d), "start_time": (datetime(2000, 1, 1, 8) + timedelta(minutes=30 * i)).time(),
+         "end_time": (datetime(2000, 1, 1, 8) + timedelta(minutes=30 * (i + 1))).time(), "is_booked": False}
+        for d in range(days) for i in range(SLOTS_PER_DAY)
+    ])
+    services.database = database
+    await services.load_availability()
+    return database, first_day
+
+
+async def run_mode(mode, args, directory):
+    database, first_day = await seed(directory, mode, args.days)
+    bot_tools.BOT_MODE = mode
+    with FakeOpenAIServer(script(mode, first_day.isoformat()), args.base_latency, args.per_token_latency) as server:
+        client_registry.close()
+        client_registry.factories["openai"] = server.client
+        session_id = (await services.clear_history())["session_id"]
+        turn_seconds = []
+        for utterance in ("I'd like to book an appointment tomorrow at 10", "My name is Ann"):
+            started = time.perf_counter()
+            await services.respond_to_transcription(utterance, session_id)
+            turn_seconds.append(time.perf_counter() - started)
+        prompt_tokens = [request["prompt_tokens"] for request in server.requests]
+    booked = await database.fetch_val("SELECT COUNT(*) FROM user_appointments")
+    await database.disconnect()
+    print(f"{mode:<6} requests={len(prompt_tokens)} prompt tokens={sum(prompt_tokens):>6} "
+          f"(max/request {max(prompt_tokens):>5}) turn latency="
+          + ", ".join(f"{seconds * 1000:.0f}ms" for seconds in turn_seconds) + f" booked={booked}")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("json", "tools"):
+            await run_mode(mode, args, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--base-latency", type=float, default=0.1)
+    parser.add_argument("--per-token-latency", type=float, default=0.0002)
+    asyncio.run(main(parser.parse_args()))
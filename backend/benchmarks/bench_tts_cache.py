@@ -0,0 +1,54 @@
+"""
+Replays a mix of repeated and unique bot sentences through services.synthesize_audio with a
+fixed-latency fake TTS backend, with and without the synthesized-audio cache.
+
+Run from the backend directory:
+    python -m benchmarks.bench_tts_cache --turns 200 --repeat-ratio 0.6
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import services
+from benchmarks.fakes import install_fakes
+from tts_cache import DEFAULT_PHRASES, TTSCache
+
+
+def workload(turns, repeat_ratio, seed=7):
+    rng = random.Random(seed)
+    return [rng.choice(DEFAULT_PHRASES) if rng.random() < repeat_ratio else f"Your appointment is at {i}."
+            for i in range(turns)]
+
+
+def replay(sentences, cache):
+    services.tts_cache = cache
+    started = time.perf_counter()
+    for sentence in sentences:
+        services.synthesize_audio(sentence)
+    return time.perf_counter() - started
+
+
+def main(args):
+    install_fakes(tts_latency=args.tts_latency)
+    sentences = workload(args.turns, args.repeat_ratio)
+
+    uncached = replay(sentences, TTSCache(max_bytes=0, directory=None))
+    print(f"no cache      {uncached:7.2f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TTSCache(directory=directory)
+        cached = replay(sentences, cache)
+        print(f"memory+disk   {cached:7.2f}s  {cache.stats()}")
+        # A fresh process only has the disk tier to start from, which holds the repeated phrases
+        # but none of the per-caller sentences
+        restarted = TTSCache(directory=directory)
+        cold = replay(sentences, restarted)
+        print(f"disk only     {cold:7.2f}s  {restarted.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--repeat-ratio", type=float, default=0.6)
+    parser.add_argument("--tts-latency", type=float, default=0.02)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+Bytes sent to the recognizer and preprocessing time for the silence-trimming stage in
+audio_ingest, on synthetic recordings: background noise around the Start/Stop clicks, with a
+few seconds of speech-like audio (amplitude-modulated harmonics plus noise) in between.
+
+Run from the backend directory:
+    python -m benchmarks.bench_vad --speech 3 --lead 1.5 --tail 2 --iterations 50
+"""
+import argparse
+import io
+import struct
+import time
+
+import numpy as np
+from fastapi import HTTPException
+
+import audio_ingest
+from audio_ingest import parse_wav_header, prepare_speech, validate_wav
+
+FORMATS = [(16000, 1), (44100, 1), (48000, 2)]
+CONFIGURATIONS = [
+    ("untouched", dict(VAD_ENABLED=False, AUDIO_DOWNMIX=False, AUDIO_TARGET_SAMPLE_RATE=0)),
+    ("trim", dict(VAD_ENABLED=True, AUDIO_DOWNMIX=False, AUDIO_TARGET_SAMPLE_RATE=0)),
+    ("trim+mono+16k", dict(VAD_ENABLED=True, AUDIO_DOWNMIX=True, AUDIO_TARGET_SAMPLE_RATE=16000)),
+]
+
+
+def synthetic_recording(sample_rate, channels, lead, speech, tail, seed=0):
+    """
+    16-bit PCM WAV bytes: noise at about -60 dBFS, with `speech` seconds of syllable-like bursts
+    at about -20 dBFS starting after `lead` seconds.
+    """
+    rng = np.random.default_rng(seed)
+    total = int((lead + speech + tail) * sample_rate)
+    signal = rng.normal(0, 32768 * 10 ** (-60 / 20), total)
+    t = np.arange(int(speech * sample_rate)) / sample_rate
+    pitch = 140 + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # Four "syllables" a second with short gaps between them
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    start = int(lead * sample_rate)
+    signal[start:start + len(t)] += 32768 * 10 ** (-20 / 20) * envelope * voiced / 1.5
+    pcm = np.clip(np.repeat(signal[:, None], channels, axis=1), -32768, 32767).astype('<i2').tobytes()
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(pcm), b'WAVE', b'fmt ', 16, 1, channels,
+                         sample_rate, sample_rate * channels * 2, channels * 2, 16, b'data', len(pcm))
+    return header + pcm
+
+
+def measure(payload, iterations):
+    sent, elapsed = 0, 0.0
+    # The first call is untimed, so NumPy's one-off setup costs don't count
+    for iteration in range(iterations + 1):
+        if iteration == 1:
+            elapsed = 0.0
+        audio = validate_wav(parse_wav_header(memoryview(io.BytesIO(payload).getbuffer())))
+        started = time.perf_counter()
+        try:
+            speech = prepare_speech(audio)
+        except HTTPException:
+            elapsed += time.perf_counter() - started
+            continue
+        elapsed += time.perf_counter() - started
+        sent = len(speech.data)
+        speech.release()
+    return sent, elapsed / iterations
+
+
+def main(args):
+    seconds = args.lead + args.speech + args.tail
+    print(f"{seconds:g} s recordings, {args.speech:g} s of speech\n")
+    print(f"{'format':>14} {'stage':>14} {'bytes in':>10} {'bytes sent':>10} {'sent %':>7} {'ms/s audio':>10}")
+    for sample_rate, channels in FORMATS:
+        payload = synthetic_recording(sample_rate, channels, args.lead, args.speech, args.tail)
+        for name, settings in CONFIGURATIONS:
+            for setting, value in settings.items():
+                setattr(audio_ingest, setting, value)
+            sent, per_call = measure(payload, args.iterations)
+            received = len(payload) - 44
+            print(f"{f'{sample_rate} Hz x{channels}':>14} {name:>14} {received:>10} {sent:>10} "
+                  f"{sent / received:>7.1%} {per_call * 1000 / seconds:>10.3f}")
+
+    audio_ingest.VAD_ENABLED = True
+    silence = synthetic_recording(16000, 1, seconds, 0, 0)
+    audio = validate_wav(parse_wav_header(memoryview(io.BytesIO(silence).getbuffer())))
+    try:
+        prepare_speech(audio).release()
+        print("\nsilent recording: passed to the recognizer")
+    except HTTPException as e:
+        print(f"\nsilent recording: rejected with {e.status_code} before any network call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lead", type=float, default=1.5, help="seconds of noise before the speech")
+    parser.add_argument("--speech", type=float, default=3.0)
+    parser.add_argument("--tail", type=float, default=2.0, help="seconds of noise after the speech")
+    parser.add_argument("--iterations", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,64 @@
+"""
+Load benchmark for POST /transcribe/ with stub STT/LLM/TTS backends that add fixed latency.
+
+Run from the backend directory:
+    python -m benchmarks.bench_voice_pipeline --requests-per-level 32
+
+Requires httpx. With the blocking SDK calls moved onto the bounded executor, throughput should
+grow roughly linearly with concurrency up to VOICE_PIPELINE_CONCURRENCY (16). Admission control
+admits as many voice requests at once (VOICE_MAX_IN_FLIGHT defaults to the same value), so
+levels above it queue at the door instead of inside the executor.
+"""
+import argparse
+import asyncio
+import io
+import time
+
+import httpx
+
+from benchmarks.fakes import install_fakes, make_wav
+
+
+async def run_level(app, concurrency, total_requests):
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    audio = make_wav(seconds=1.0)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # One conversation session per simulated patient, created before the clock starts
+        session_ids = [(await client.post("/clear-history/")).json()["session_id"] for _ in range(total_requests)]
+
+        async def one(i):
+            async with semaphore:
+                files = {"file": (f"bench_{concurrency}_{i}.wav", io.BytesIO(audio), "audio/wav")}
+                response = await client.post("/transcribe/", files=files, data={"session_id": session_ids[i]})
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        return time.perf_counter() - started
+
+
+async def main(args):
+    install_fakes(args.stt_latency, args.llm_latency, args.tts_latency)
+    import migrations
+    from main import app
+    from sqlitedatabase import database
+
+    # The app's startup event, which would migrate, does not run here
+    migrations.migrate()
+    await database.connect()
+    print(f"{'concurrency':>11} {'requests':>8} {'seconds':>8} {'req/s':>8}")
+    for concurrency in args.levels:
+        elapsed = await run_level(app, concurrency, args.requests_per_level)
+        print(f"{concurrency:>11} {args.requests_per_level:>8} {elapsed:>8.2f} {args.requests_per_level / elapsed:>8.2f}")
+    await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests-per-level", type=int, default=32)
+    parser.add_argument("--stt-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--tts-latency", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
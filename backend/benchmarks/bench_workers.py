@@ -0,0 +1,117 @@
+"""
+Throughput of the voice endpoint with 1, 2 and 4 uvicorn worker processes sharing conversation
+state through a Redis-protocol store (the local stand-in from benchmarks.fake_redis). Every
+simulated patient opens a session and sends several turns; with per-process state, turns landing
+on a worker that did not create the session would fail with 404, so errors are reported as well.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers --patients 64 --turns 3 --concurrency 32
+"""
+import argparse
+import asyncio
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.fakes import make_wav
+import migrations
+from sqlitedatabase import create_migration_engine
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}")
+            try:
+                if (await client.get("/health/clients/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("workers did not start")
+
+
+async def load(base_url, args):
+    audio = make_wav(seconds=1.0)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statuses = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def patient(i):
+            async with semaphore:
+                session_id = (await client.post("/clear-history/")).json()["session_id"]
+                for turn in range(args.turns):
+                    files = {"file": (f"patient_{i}_{turn}.wav", io.BytesIO(audio), "audio/wav")}
+                    response = await client.post("/transcribe/", files=files, data={"session_id": session_id})
+                    statuses.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(patient(i) for i in range(args.patients)))
+        return statuses, time.perf_counter() - started
+
+
+async def run(workers, shared_store_url, directory, args):
+    database_url = f"sqlite:///{os.path.join(directory, f'workers_{workers}.db')}"
+    # Create the schema once up front instead of racing in every worker
+    migrations.migrate(create_migration_engine(database_url))
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, TTS_PREWARM="0",
+               FAKE_STT_LATENCY=str(args.stt_latency), FAKE_LLM_LATENCY=str(args.llm_latency),
+               FAKE_TTS_LATENCY=str(args.tts_latency))
+    if shared_store_url:
+        env["SHARED_STORE_URL"] = shared_store_url
+    else:
+        env.pop("SHARED_STORE_URL", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await wait_until_ready(base_url, process)
+        statuses, elapsed = await load(base_url, args)
+    finally:
+        process.terminate()
+        process.wait()
+    failed = sum(1 for status in statuses if status != 200)
+    store = "shared" if shared_store_url else "local"
+    print(f"{workers} worker(s), {store} store: {len(statuses) / elapsed:6.1f} turns/s, "
+          f"{failed}/{len(statuses)} failed")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory, FakeRedisServer() as redis_server:
+        for workers in args.workers:
+            await run(workers, redis_server.url, directory, args)
+        if args.compare_local:
+            await run(max(args.workers), None, directory, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--patients", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stt-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--tts-latency", type=float, default=0.02)
+    parser.add_argument("--compare-local", action="store_true",
+                        help="also run the largest worker count with per-process state, to show the failures")
+    asyncio.run(main(parser.parse_args()))
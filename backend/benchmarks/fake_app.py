@@ -0,0 +1,18 @@
+"""
+ASGI entry point serving the real app with the fake STT/LLM/TTS clients from benchmarks.fakes, so
+it can be run under uvicorn with several worker processes. Latencies come from the environment:
+
+    FAKE_STT_LATENCY=0.05 FAKE_LLM_LATENCY=0.1 FAKE_TTS_LATENCY=0.05 \\
+        uvicorn benchmarks.fake_app:app --workers 2
+"""
+import os
+
+from benchmarks.fakes import install_fakes
+
+install_fakes(
+    stt_latency=float(os.getenv('FAKE_STT_LATENCY', '0.05')),
+    llm_latency=float(os.getenv('FAKE_LLM_LATENCY', '0.1')),
+    tts_latency=float(os.getenv('FAKE_TTS_LATENCY', '0.05')),
+)
+
+from main import app  # noqa: E402,F401
@@ -0,0 +1,93 @@
+"""
+Local TLS gRPC server that answers google.cloud.speech.v1.Speech/Recognize and
+google.cloud.texttospeech.v1.TextToSpeech/SynthesizeSpeech with canned responses.
+
+Requires cryptography, for the server's self-signed certificate.
+"""
+import datetime
+from concurrent import futures
+
+import grpc
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from google.cloud import speech
+from google.cloud import texttospeech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+
+
+def self_signed_certificate(hostname="localhost"):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, hostname)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(hostname)]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return key_pem, certificate.public_bytes(serialization.Encoding.PEM)
+
+
+def _recognize(request, context):
+    alternative = speech.SpeechRecognitionAlternative(transcript="I would like to book an appointment")
+    return speech.RecognizeResponse(results=[speech.SpeechRecognitionResult(alternatives=[alternative])])
+
+
+def _synthesize(request, context):
+    return texttospeech.SynthesizeSpeechResponse(audio_content=b"\xff\xfb\x90\x00" * 256)
+
+
+def _handler(service, method, behaviour, request_type, response_type):
+    return grpc.method_handlers_generic_handler(service, {
+        method: grpc.unary_unary_rpc_method_handler(
+            behaviour,
+            request_deserializer=request_type.deserialize,
+            response_serializer=response_type.serialize,
+        )
+    })
+
+
+class FakeGoogleServer:
+    """
+    Serves the Speech and TextToSpeech RPCs over TLS on an ephemeral localhost port.
+    """
+
+    def __init__(self):
+        self.key_pem, self.cert_pem = self_signed_certificate()
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+        self.server.add_generic_rpc_handlers([
+            _handler("google.cloud.speech.v1.Speech", "Recognize", _recognize,
+                     speech.RecognizeRequest, speech.RecognizeResponse),
+            _handler("google.cloud.texttospeech.v1.TextToSpeech", "SynthesizeSpeech", _synthesize,
+                     texttospeech.SynthesizeSpeechRequest, texttospeech.SynthesizeSpeechResponse),
+        ])
+        credentials = grpc.ssl_server_credentials([(self.key_pem, self.cert_pem)])
+        self.port = self.server.add_secure_port("localhost:0", credentials)
+        self.address = f"localhost:{self.port}"
+
+    def __enter__(self):
+        self.server.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.stop(grace=None)
+
+    def channel(self):
+        return grpc.secure_channel(self.address, grpc.ssl_channel_credentials(root_certificates=self.cert_pem))
+
+    def speech_client(self):
+        return speech.SpeechClient(transport=SpeechGrpcTransport(channel=self.channel()))
+
+    def tts_client(self):
+        return texttospeech.TextToSpeechClient(
+            transport=TextToSpeechGrpcTransport(channel=self.channel()))
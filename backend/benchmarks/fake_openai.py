@@ -0,0 +1,134 @@
+"""
+Local stand-in for the OpenAI chat completions HTTP API. Replies come from a script, and each
+request sleeps for a base latency plus a per-prompt-token cost, so prompt size shows up in latency.
+Generating the reply costs output_token_latency per ~4-character token; with "stream": true the
+tokens are sent as server-sent events as they are "generated".
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def estimate_tokens(messages):
+    return sum(len(str(message.get("content") or "")) + len(json.dumps(message.get("tool_calls") or ""))
+               for message in messages) // 4
+
+
+def output_chunks(content, size=4):
+    content = content or ""
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+def content_reply(content):
+    return {"content": content}
+
+
+def tool_call_reply(function, **arguments):
+    return {"tool_calls": [{"name": function, "arguments": arguments}]}
+
+
+class FakeOpenAIServer:
+    """
+    Serves POST /v1/chat/completions on an ephemeral localhost port. `script` is a list of replies
+    made with content_reply/tool_call_reply, consumed in order.
+    """
+
+    def __init__(self, script=None, base_latency=0.1, per_token_latency=0.00002, output_token_latency=0.0):
+        self.script = list(script or [])
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.output_token_latency = output_token_latency
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self):
+        import openai
+
+        return openai.OpenAI(base_url=self.base_url, api_key="fake", max_retries=0)
+
+    def next_reply(self, request):
+        with self._lock:
+            self.requests.append(request)
+            return self.script.pop(0) if self.script else content_reply("Is there anything else I can help with?")
+
+    def completion(self, request):
+        prompt_tokens = estimate_tokens(request["messages"])
+        reply = self.next_reply({**request, "prompt_tokens": prompt_tokens})
+        output_tokens = len(output_chunks(reply.get("content")))
+        time.sleep(self.base_latency + prompt_tokens * self.per_token_latency + output_tokens * self.output_token_latency)
+        message = {"role": "assistant", "content": reply.get("content")}
+        if reply.get("tool_calls"):
+            message["tool_calls"] = [
+                {"id": f"call_{len(self.requests)}_{i}", "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])}}
+                for i, call in enumerate(reply["tool_calls"])
+            ]
+        return {
+            "id": f"chatcmpl-fake-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+        }
+
+    def stream(self, request):
+        """
+        Yields chat.completion.chunk payloads for a content reply, one per output token.
+        """
+        prompt_tokens = estimate_tokens(request["messages"])
+        reply = self.next_reply({**request, "prompt_tokens": prompt_tokens})
+        time.sleep(self.base_latency + prompt_tokens * self.per_token_latency)
+        chunk = {
+            "id": f"chatcmpl-fake-{len(self.requests)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+        }
+        yield {**chunk, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+        for token in output_chunks(reply.get("content")):
+            time.sleep(self.output_token_latency)
+            yield {**chunk, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+        yield {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if request.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for chunk in fake.stream(request):
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                body = json.dumps(fake.completion(request)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
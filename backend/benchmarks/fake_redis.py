@@ -0,0 +1,240 @@
+"""
+Local stand-in for a Redis server. Speaks RESP2 over TCP and implements the commands the shared
+stores use (strings, counters, lists, key expiry, SCAN and MULTI/EXEC transactions), so
+RedisConversationStore and RedisChangeLog can be exercised with the real redis client without a
+Redis installation.
+
+Run standalone, e.g. for a multi-worker uvicorn:
+    python -m benchmarks.fake_redis --port 6390
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class CommandError(Exception):
+    pass
+
+
+class FakeRedisServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"redis://{host}:{self.server.server_address[1]}/0"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def execute(self, command, *args):
+        handler = getattr(self, "cmd_" + command.lower(), None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{command}'")
+        with self.lock:
+            return handler(*args)
+
+    def execute_transaction(self, commands):
+        # Runs the commands queued since MULTI without letting another connection in between
+        with self.lock:
+            replies = []
+            for command in commands:
+                handler = getattr(self, "cmd_" + command[0].decode().lower(), None)
+                try:
+                    if handler is None:
+                        raise CommandError(f"ERR unknown command '{command[0].decode()}'")
+                    replies.append(handler(*command[1:]))
+                except CommandError as e:
+                    replies.append(e)
+            return replies
+
+    def _live(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def _list(self, key):
+        value = self._live(key)
+        if value is not None and not isinstance(value, list):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_ping(self, *args):
+        return args[0] if args else "+PONG"
+
+    def cmd_client(self, *args):
+        return "+OK"
+
+    def cmd_select(self, db):
+        return "+OK"
+
+    def cmd_flushall(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return "+OK"
+
+    def cmd_get(self, key):
+        value = self._live(key)
+        if isinstance(value, list):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_set(self, key, value, *options):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        return "+OK"
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.cmd_get(key) or 0) + int(amount)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def cmd_rpush(self, key, *values):
+        items = self._list(key)
+        if items is None:
+            items = self.data[key] = []
+        items.extend(values)
+        return len(items)
+
+    def cmd_rpushx(self, key, *values):
+        items = self._list(key)
+        if items is None:
+            return 0
+        items.extend(values)
+        return len(items)
+
+    def cmd_lrange(self, key, start, stop):
+        items = self._list(key) or []
+        start, stop = int(start), int(stop)
+        stop = len(items) if stop == -1 else stop + 1
+        return items[start:stop]
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self._list(key)
+        if items is None:
+            return "+OK"
+        start, stop = int(start), int(stop)
+        start = max(start + len(items) if start < 0 else start, 0)
+        stop = stop + len(items) if stop < 0 else stop
+        items[:] = items[start:stop + 1]
+        if not items:
+            self.cmd_del(key)
+        return "+OK"
+
+    def cmd_pexpire(self, key, milliseconds):
+        if self._live(key) is None:
+            return 0
+        self.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_scan(self, cursor, *options):
+        pattern = "*"
+        for name, value in zip(options[::2], options[1::2]):
+            if name.upper() == b"MATCH":
+                pattern = value.decode()
+        keys = [key for key in list(self.data) if self._live(key) is not None
+                and fnmatch.fnmatchcase(key.decode(), pattern)]
+        return [b"0", keys]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # Commands queued since MULTI, or None outside a transaction
+                queued = None
+                while True:
+                    try:
+                        command = self.read_command()
+                    except (ConnectionError, ValueError):
+                        return
+                    if command is None:
+                        return
+                    if not command:
+                        continue
+                    name = command[0].decode().upper()
+                    if name == "MULTI":
+                        queued = []
+                        self.wfile.write(encode("+OK"))
+                    elif name == "EXEC" and queued is not None:
+                        self.wfile.write(encode(fake.execute_transaction(queued)))
+                        queued = None
+                    elif name == "DISCARD" and queued is not None:
+                        queued = None
+                        self.wfile.write(encode("+OK"))
+                    elif queued is not None:
+                        queued.append(command)
+                        self.wfile.write(encode("+QUEUED"))
+                    else:
+                        try:
+                            reply = fake.execute(command[0].decode(), *command[1:])
+                        except CommandError as e:
+                            reply = e
+                        self.wfile.write(encode(reply))
+
+            def read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                if not line.startswith(b"*"):
+                    # Inline command, as sent by redis-cli or telnet
+                    return line.split()
+                arguments = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    arguments.append(self.rfile.read(length + 2)[:-2])
+                return arguments
+
+        return Handler
+
+
+def encode(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, CommandError):
+        return f"-{reply}\r\n".encode()
+    if isinstance(reply, str):
+        # Status replies are passed as "+OK"-style strings
+        return reply.encode() + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = FakeRedisServer(port=args.port)
+    print(f"Serving {server.url}")
+    server.server.serve_forever()
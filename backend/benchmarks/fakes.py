@@ -0,0 +1,237 @@
+"""
+Stand-in STT/LLM/TTS backends for benchmarks. Each fake sleeps for a base latency plus optional
+jitter to mimic the network round trip of the real provider, without needing credentials or
+network access.
+
+Scripted conversations: a benchmark sends each request with an X-Request-ID, which becomes the
+request's trace id, and registers what the patient says in that request (FakeSpeechClient.utterances)
+and what the bot answers (FakeCompletions.replies) under the same id. Requests without a script
+fall back to the fixed transcript and reply.
+
+Fault injection: each fake has a Faults instance that makes a share of its calls fail with a 503,
+stall for a long time, or (during an outage) all fail. Calls given a timeout, as the resilience
+layer passes it, give up with a timeout error when the delay would exceed it, like the real SDKs.
+"""
+import asyncio
+import io
+import json
+import math
+import random
+import struct
+import time
+import wave
+from types import SimpleNamespace
+
+from observability import trace_id
+from streaming_stt import StreamingRecognizer
+
+DEFAULT_BOT_REPLY = {
+    "date": None,
+    "time": None,
+    "name": None,
+    "assistant_message_to_the_user": "Would you like to schedule, reschedule, or cancel an appointment?",
+    "context": "",
+    "action": "UNRELATED",
+}
+
+
+class ServiceUnavailable(Exception):
+    """
+    Stands in for the providers' 503 errors.
+    """
+    status_code = 503
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Stands in for the providers' client-side timeout errors.
+    """
+
+
+class Faults:
+    """
+    Failures injected into a fake provider: error_rate of calls fail with ServiceUnavailable after
+    half their latency, slow_rate of calls take slow_latency seconds longer, and while outage is set
+    every call fails.
+    """
+
+    def __init__(self, error_rate=0.0, slow_rate=0.0, slow_latency=5.0, outage=False):
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.outage = outage
+        self.injected = 0
+
+    def delay(self, latency, timeout=None):
+        """
+        Sleeps like a call of the given latency would, raising the injected failure, if any.
+        """
+        if self.outage or random.random() < self.error_rate:
+            self.injected += 1
+            wait(latency / 2, timeout)
+            raise ServiceUnavailable("injected failure")
+        if random.random() < self.slow_rate:
+            self.injected += 1
+            latency += self.slow_latency
+        wait(latency, timeout)
+
+
+def wait(seconds, timeout=None):
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise DeadlineExceeded(f"timed out after {timeout:.2f}s")
+    time.sleep(seconds)
+
+
+def simulate_latency(latency, jitter=0.0, faults=None, timeout=None):
+    """
+    Sleeps for latency seconds plus an exponentially distributed extra delay averaging jitter
+    seconds, which gives the long tail real providers show, and applies the injected faults.
+    """
+    latency += random.expovariate(1 / jitter) if jitter > 0 else 0.0
+    (faults or Faults()).delay(latency, timeout)
+
+
+def make_wav(seconds=2.0, sample_rate=16000, channels=1, frequency=220.0):
+    """
+    Builds an in-memory 16-bit PCM WAV containing a sine tone.
+    """
+    frames = int(seconds * sample_rate)
+    samples = [int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate)) for i in range(frames)]
+    pcm = struct.pack(f"<{frames}h", *samples)
+    if channels > 1:
+        pcm = b"".join(pcm[i:i + 2] * channels for i in range(0, len(pcm), 2))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class FakeSpeechClient:
+    """
+    Mimics google.cloud.speech.SpeechClient.recognize with a blocking delay.
+    """
+    latency = 0.1
+    jitter = 0.0
+    transcript = "I would like to book an appointment"
+    # Trace id of a /transcribe/ request to what the patient says in it
+    utterances = {}
+    faults = Faults()
+
+    def recognize(self, config=None, audio=None, timeout=None, **kwargs):
+        simulate_latency(self.latency, self.jitter, self.faults, timeout)
+        alternative = SimpleNamespace(transcript=self.utterances.get(trace_id.get(), self.transcript))
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+
+class FakeTextToSpeechClient:
+    """
+    Mimics google.cloud.texttospeech.TextToSpeechClient.synthesize_speech with a blocking delay.
+    """
+    latency = 0.1
+    jitter = 0.0
+    faults = Faults()
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, timeout=None, **kwargs):
+        simulate_latency(self.latency, self.jitter, self.faults, timeout)
+        return SimpleNamespace(audio_content=b"\xff\xfb\x90\x00" * 256)
+
+
+class FakeCompletions:
+    """
+    Mimics OpenAI().chat.completions with a blocking delay and a canned JSON reply. latency is the
+    time to the first token; with stream=True the reply then arrives in ~4-character tokens, each
+    taking token_latency.
+    """
+    latency = 0.2
+    jitter = 0.0
+    token_latency = 0.0
+    reply = DEFAULT_BOT_REPLY
+    # Trace id of a /transcribe/ request to the bot's JSON reply in it
+    replies = {}
+    calls = 0
+    faults = Faults()
+
+    def __init__(self, timeout=None):
+        # Set on the copies made by FakeOpenAI.with_options(timeout=...)
+        self.timeout = timeout
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        FakeCompletions.calls += 1
+        content = json.dumps(self.replies.get(trace_id.get(), self.reply))
+        simulate_latency(self.latency, self.jitter, self.faults, self.timeout)
+        if stream:
+            return self.stream(content)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def stream(self, content):
+        for i in range(0, len(content), 4):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            delta = SimpleNamespace(content=content[i:i + 4])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeOpenAI:
+    """
+    Mimics the openai.OpenAI client surface used by OpenAIBot.
+    """
+
+    def __init__(self, timeout=None):
+        self.chat = SimpleNamespace(completions=FakeCompletions(timeout))
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def with_options(self, timeout=None, **options):
+        return FakeOpenAI(timeout)
+
+
+def install_fakes(stt_latency=0.1, llm_latency=0.2, tts_latency=0.1, tts_cache_enabled=False,
+                  stt_jitter=0.0, llm_jitter=0.0, tts_jitter=0.0, llm_token_latency=0.0,
+                  stt_faults=None, llm_faults=None, tts_faults=None):
+    """
+    Points the process-wide client registry at the fakes above. The TTS cache is switched off by
+    default so every turn pays the fake synthesis latency. Faults are none unless given.
+    """
+    from clients import client_registry
+    from tts_cache import tts_cache
+
+    if not tts_cache_enabled:
+        tts_cache.max_bytes = 0
+        tts_cache.directory = None
+
+    FakeSpeechClient.latency = stt_latency
+    FakeTextToSpeechClient.latency = tts_latency
+    FakeCompletions.latency = llm_latency
+    FakeSpeechClient.jitter = stt_jitter
+    FakeTextToSpeechClient.jitter = tts_jitter
+    FakeCompletions.jitter = llm_jitter
+    FakeCompletions.token_latency = llm_token_latency
+    FakeSpeechClient.faults = stt_faults or Faults()
+    FakeCompletions.faults = llm_faults or Faults()
+    FakeTextToSpeechClient.faults = tts_faults or Faults()
+
+    client_registry.close()
+    client_registry.factories.update(speech=FakeSpeechClient, tts=FakeTextToSpeechClient, openai=FakeOpenAI)
+
+
+class FakeStreamingRecognizer(StreamingRecognizer):
+    """
+    Local stand-in for streaming_stt.GoogleStreamingRecognizer. Emits an interim transcript per
+    audio chunk and a final transcript once the chunk stream ends.
+    """
+
+    def __init__(self, words=None, finalize_latency=0.05):
+        self.words = (words or FakeSpeechClient.transcript).split()
+        self.finalize_latency = finalize_latency
+
+    async def stream(self, audio_chunks):
+        received = 0
+        async for _ in audio_chunks:
+            received += 1
+            yield {"type": "interim", "transcript": " ".join(self.words[:received])}
+        await asyncio.sleep(self.finalize_latency)
+        yield {"type": "final", "transcript": " ".join(self.words)}
@@ -0,0 +1,93 @@
+"""
+Concurrency stress test for booking. Fires hundreds of simultaneous book_appointment calls at a
+single slot and asserts exactly one wins, then measures booking throughput when the same number
+of patients spread over distinct slots. Uses a scratch SQLite database.
+
+Run from the backend directory:
+    python -m benchmarks.stress_booking --patients 300
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import migrations
+import services
+from schemas import TimeSlotModel, UserAppointmentModel
+from sqlitedatabase import create_database, create_migration_engine
+
+SLOT_DATE = date(2030, 1, 7)
+SLOTS_PER_DAY = 16
+
+
+async def fresh_database(directory, name, slots):
+    url = f"sqlite:///{os.path.join(directory, name)}.db"
+    migrations.migrate(create_migration_engine(url))
+    database = create_database(url)
+    await database.connect()
+    await database.execute_many(TimeSlotModel.__table__.insert(), [
+        {"date": slot_date(i), "start_time": slot_start(i).time(),
+         "end_time": (slot_start(i) + services.SLOT_DURATION).time(), "is_booked": False}
+        for i in range(slots)
+    ])
+    services.database = database
+    return database
+
+
+async def fire(requests):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(services.book_appointment(*request) for request in requests),
+                                   return_exceptions=True)
+    return results, time.perf_counter() - started
+
+
+def slot_date(i):
+    return SLOT_DATE + timedelta(days=i // SLOTS_PER_DAY)
+
+
+def slot_start(i):
+    opening = datetime.combine(slot_date(i), datetime.strptime("08:00", "%H:%M").time())
+    return opening + (i % SLOTS_PER_DAY) * services.SLOT_DURATION
+
+
+def request(i, patient):
+    return f"patient-{patient}", slot_date(i).isoformat(), slot_start(i).strftime("%H:%M")
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as directory:
+        # Everyone races for the same slot
+        database = await fresh_database(directory, "contended", 1)
+        requests = [request(0, i) for i in range(args.patients)]
+        results, elapsed = await fire(requests)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        booked = [result for result in results if isinstance(result, dict) and "message" in result]
+        appointments = await database.fetch_val(f"SELECT COUNT(*) FROM {UserAppointmentModel.__tablename__}")
+        booked_slots = await database.fetch_val(
+            f"SELECT COUNT(*) FROM {TimeSlotModel.__tablename__} WHERE is_booked = 1")
+        await database.disconnect()
+        print(f"one slot, {args.patients} patients: {len(booked)} booked, "
+              f"{len(results) - len(booked) - len(failures)} refused, {len(failures)} errors, "
+              f"{args.patients / elapsed:.0f} attempts/s")
+        assert not failures, failures[:3]
+        assert len(booked) == 1 and appointments == 1 and booked_slots == 1
+
+        # Every patient gets their own slot
+        database = await fresh_database(directory, "spread", args.patients)
+        requests = [request(i, i) for i in range(args.patients)]
+        results, elapsed = await fire(requests)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        appointments = await database.fetch_val(f"SELECT COUNT(*) FROM {UserAppointmentModel.__tablename__}")
+        await database.disconnect()
+        print(f"{args.patients} slots, {args.patients} patients: {appointments} booked, "
+              f"{len(failures)} errors, {args.patients / elapsed:.0f} bookings/s")
+        assert not failures, failures[:3]
+        assert appointments == args.patients
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=300)
+    asyncio.run(main(parser.parse_args()))
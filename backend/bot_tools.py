@@ -0,0 +1,49 @@
+import os
+
+# "json" keeps the calendar in the prompt and parses a JSON reply; "tools" lets the model look up
+# availability and perform bookings through function calls instead
+BOT_MODE = os.getenv('BOT_MODE', 'json')
+# Upper bound on model round trips within one conversation turn in tools mode
+MAX_TOOL_ROUNDS = int(os.getenv('MAX_TOOL_ROUNDS', '4'))
+
+TOOL_CALLING_PROMPT = """
+Hi, you are a scheduling assistant for Dr. Walnut's clinic, speaking with a patient over the phone.
+The patient can schedule, reschedule or cancel an appointment. Appointments are {slot_minutes} minutes long.
+Use find_available_slots to check the doctor's availability instead of guessing, and suggest the closest
+available times when the requested one is taken. Ask for the patient's name before booking, rescheduling
+or cancelling, then call book, reschedule or cancel. Only tell the patient an action succeeded after the
+tool result confirms it. Dates are YYYY-MM-DD and times are HH:MM (24-hour).
+Reply with a short plain-text message that will be read aloud to the patient.
+"""
+
+_DATE = {"type": "string", "description": "Date in YYYY-MM-DD format"}
+_TIME = {"type": "string", "description": "Start time in HH:MM 24-hour format"}
+_NAME = {"type": "string", "description": "The patient's name"}
+
+
+def _function(name, description, properties, required):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
+
+TOOLS = [
+    _function(
+        "find_available_slots",
+        "List free appointment start times on a date, closest to near_time first. If the date has no "
+        "free slots, the earliest free slots on the following days are returned.",
+        {"date": _DATE, "near_time": {**_TIME, "description": "Preferred time in HH:MM, optional"},
+         "limit": {"type": "integer", "description": "Maximum number of slots to return", "default": 5}},
+        ["date"],
+    ),
+    _function("book", "Book the appointment slot starting at date/time for the patient.",
+              {"name": _NAME, "date": _DATE, "time": _TIME}, ["name", "date", "time"]),
+    _function("reschedule", "Move the patient's existing appointment to the slot starting at date/time.",
+              {"name": _NAME, "date": _DATE, "time": _TIME}, ["name", "date", "time"]),
+    _function("cancel", "Cancel the patient's existing appointment.", {"name": _NAME}, ["name"]),
+]
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+from observability import logger
+
+# When the clients are created: "background" (by a task started once the app is serving, which
+# /readyz waits for), "blocking" (before the app starts serving) or "lazy" (by the first request
+# that needs each one, which then also pays for importing its SDK)
+CLIENT_STARTUP = os.getenv('CLIENT_STARTUP', 'background')
+# Set to 0 to skip opening provider connections when the clients are created at startup
+CLIENT_WARMUP = os.getenv('CLIENT_WARMUP', '1') != '0'
+# Seconds to wait for each provider channel to become ready during warm-up and health checks
+CLIENT_WARMUP_TIMEOUT = float(os.getenv('CLIENT_WARMUP_TIMEOUT', '5'))
+
+
+# The SDKs take about a second to import, so they are imported when their client is first created
+
+def speech_client():
+    from google.cloud import speech
+
+    return speech.SpeechClient()
+
+
+def tts_client():
+    from google.cloud import texttospeech
+
+    return texttospeech.TextToSpeechClient()
+
+
+def openai_client():
+    import openai
+
+    return openai.OpenAI()
+
+
+def _grpc_channel(client):
+    transport = getattr(client, 'transport', None)
+    return getattr(transport, 'grpc_channel', None)
+
+
+class ClientRegistry:
+    """
+    Holds one long-lived Speech, TextToSpeech and OpenAI client per process, so gRPC channels and
+    HTTP connection pools are set up once at startup instead of on every conversation turn.
+    """
+
+    def __init__(self, speech_factory=speech_client, tts_factory=tts_client, openai_factory=openai_client):
+        factories = {'speech': speech_factory, 'tts': tts_factory, 'openai': openai_factory}
+        # A factory of None leaves that provider out of the registry
+        self.factories = {name: factory for name, factory in factories.items() if factory is not None}
+        self.setup_seconds = {}
+        self.errors = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @property
+    def speech(self):
+        return self.get('speech')
+
+    @property
+    def tts(self):
+        return self.get('tts')
+
+    @property
+    def openai(self):
+        return self.get('openai')
+
+    def get(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._create(name)
+        return client
+
+    def start(self, warm_up=CLIENT_WARMUP):
+        """
+        Creates every client, recording failures instead of raising so the API can still start
+        without provider credentials. Optionally opens each connection ahead of the first request.
+        """
+        for name in self.factories:
+            try:
+                self.get(name)
+                if warm_up:
+                    self._warm_up(name)
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.warning("Could not start client", extra={"client": name, "error": str(e)})
+
+    def health(self):
+        status = {}
+        for name in self.factories:
+            client = self._clients.get(name)
+            if client is None:
+                status[name] = {"ready": False, "error": self.errors.get(name, "not started")}
+                continue
+            channel = _grpc_channel(client)
+            ready = name not in self.errors
+            if channel is not None:
+                import grpc
+
+                try:
+                    grpc.channel_ready_future(channel).result(timeout=CLIENT_WARMUP_TIMEOUT)
+                    ready = True
+                except grpc.FutureTimeoutError:
+                    ready = False
+            status[name] = {"ready": ready, "setup_seconds": self.setup_seconds.get(name),
+                            "error": self.errors.get(name)}
+        return status
+
+    def close(self):
+        with self._lock:
+            for name, client in self._clients.items():
+                try:
+                    transport = getattr(client, 'transport', None)
+                    if transport is not None and hasattr(transport, 'close'):
+                        transport.close()
+                    elif hasattr(client, 'close'):
+                        client.close()
+                except Exception as e:
+                    logger.warning("Error closing client", extra={"client": name, "error": str(e)})
+            self._clients.clear()
+
+    def _create(self, name):
+        started = time.perf_counter()
+        client = self.factories[name]()
+        self._clients[name] = client
+        self.errors.pop(name, None)
+        self.setup_seconds[name] = time.perf_counter() - started
+        return client
+
+    def _warm_up(self, name):
+        # Establish the TCP/TLS connection now so the first patient does not pay for it
+        started = time.perf_counter()
+        client = self._clients[name]
+        channel = _grpc_channel(client)
+        if channel is not None:
+            import grpc
+
+            grpc.channel_ready_future(channel).result(timeout=CLIENT_WARMUP_TIMEOUT)
+        elif name == 'openai':
+            client.with_options(timeout=CLIENT_WARMUP_TIMEOUT, max_retries=0).models.list()
+        self.setup_seconds[name] += time.perf_counter() - started
+
+
+client_registry = ClientRegistry()
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from conversation_store import CONVERSATION_MAX_SESSIONS
+from observability import logger
+
+# Upper bound on the estimated prompt tokens sent per request. Older turns are folded into the
+# summary until the prompt fits; the system prompt and availability are always sent in full.
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '4000'))
+# Number of most recent user/bot exchanges sent verbatim
+CONTEXT_RECENT_TURNS = int(os.getenv('CONTEXT_RECENT_TURNS', '4'))
+# Slots carried over from folded turns; later values replace earlier ones
+SUMMARY_FIELDS = ("name", "date", "time", "action")
+# Per-message framing overhead in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """
+    Rough token count (about four characters per token for English), good enough for budgeting.
+    """
+    return len(text or "") // 4 + 1
+
+
+def message_tokens(messages):
+    return sum(estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def parse_bot_reply(content):
+    """
+    Returns the JSON object in a json-mode bot reply, or None for plain text (tools mode).
+    """
+    text = (content or "").strip().removeprefix("```json").removesuffix("```").strip()
+    try:
+        reply = json.loads(text)
+    except ValueError:
+        return None
+    return reply if isinstance(reply, dict) else None
+
+
+def group_turns(history):
+    """
+    Splits the stored history (without its system entry) into user/bot exchanges.
+    """
+    turns = []
+    for item in history:
+        if item['role'] == 'user' or not turns:
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+
+class RollingSummary:
+    """
+    The booking details (name, date, time, action) extracted from turns that are no longer sent.
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.slots = {}
+
+    def fold(self, turn):
+        self.turns += 1
+        for item in turn:
+            if item['role'] != 'bot':
+                continue
+            reply = parse_bot_reply(item['content']) or {}
+            for field in SUMMARY_FIELDS:
+                if reply.get(field):
+                    self.slots[field] = reply[field]
+
+    def render(self):
+        details = ", ".join(f"{field}: {self.slots[field]}" for field in SUMMARY_FIELDS if field in self.slots)
+        return (f"Summary of the {self.turns} earlier turns of this call, which are not repeated below: "
+                + (details if details else "no name, date, time or action was given") + ".")
+
+
+class ContextWindow:
+    """
+    Builds the chat messages for one request from a session's history. The static system prompt
+    comes first and never changes within a session, so providers can cache it as a prompt prefix;
+    it is followed by the per-turn context (availability), the rolling summary of older turns, the
+    last recent_turns exchanges verbatim and the new question.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, recent_turns=CONTEXT_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+
+    def build(self, history, question, context=None):
+        prefix = [{"role": "system", "content": history[0]['content']}]
+        if context:
+            prefix.append({"role": "system", "content": context})
+        question_message = {"role": "user", "content": question}
+
+        turns = group_turns(history[1:])
+        split = max(len(turns) - self.recent_turns, 0)
+        summary = RollingSummary()
+        for turn in turns[:split]:
+            summary.fold(turn)
+        recent = [self.to_message(item) for turn in turns[split:] for item in turn]
+        recent_sizes = [len(turn) for turn in turns[split:]]
+
+        fixed_tokens = message_tokens(prefix + [question_message])
+        while recent_sizes and fixed_tokens + message_tokens(recent) + self.summary_tokens(summary) > self.token_budget:
+            size = recent_sizes.pop(0)
+            summary.fold(turns[split])
+            split += 1
+            recent = recent[size:]
+
+        summary_messages = [{"role": "system", "content": summary.render()}] if summary.turns else []
+        return prefix + summary_messages + recent + [question_message]
+
+    @staticmethod
+    def summary_tokens(summary):
+        return estimate_tokens(summary.render()) + MESSAGE_OVERHEAD_TOKENS if summary.turns else 0
+
+    @staticmethod
+    def to_message(item):
+        return {"role": "assistant" if item['role'] == 'bot' else item['role'], "content": item['content']}
+
+
+class PromptTokenTracker:
+    """
+    Records the prompt size of every request per session: the local estimate, and the provider's
+    count when the response reports usage. Only the most recently active max_sessions are kept.
+    """
+
+    def __init__(self, max_sessions=CONVERSATION_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._turns = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, session_id, estimated, reported=None):
+        with self._lock:
+            turns = self._turns.setdefault(session_id, [])
+            turns.append({"estimated": estimated, "reported": reported})
+            self._turns.move_to_end(session_id)
+            while len(self._turns) > self.max_sessions:
+                self._turns.popitem(last=False)
+        logger.info("Prompt tokens", extra={"session_id": session_id, "request": len(turns),
+                                            "estimated": estimated, "reported": reported})
+
+    def forget(self, session_id):
+        with self._lock:
+            self._turns.pop(session_id, None)
+
+    def session(self, session_id):
+        with self._lock:
+            return list(self._turns.get(session_id, []))
+
+    def stats(self):
+        with self._lock:
+            sizes = [turn["reported"] or turn["estimated"] for turns in self._turns.values() for turn in turns]
+        return {
+            "sessions": len(self._turns),
+            "requests": len(sizes),
+            "mean_prompt_tokens": round(sum(sizes) / len(sizes), 1) if sizes else 0,
+            "max_prompt_tokens": max(sizes, default=0),
+        }
+
+
+context_window = ContextWindow()
+prompt_tokens = PromptTokenTracker()
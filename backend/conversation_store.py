@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from shared_store import SHARED_STORE_URL, redis_client
+
+# Maximum number of live conversations kept in memory; the least recently used one is evicted first
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '1000'))
+# Seconds of inactivity after which a conversation is dropped
+CONVERSATION_TTL_SECONDS = float(os.getenv('CONVERSATION_TTL_SECONDS', '3600'))
+# Optional JSON-lines file that every history append is written to, replayed on startup
+CONVERSATION_LOG_PATH = os.getenv('CONVERSATION_LOG_PATH')
+
+
+class AppendOnlyHistoryLog:
+    """
+    Persists conversation events as one JSON object per line, so each turn costs a single append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, event):
+        self.open()
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class ConversationStore:
+    """
+    Keeps the message history of every caller, keyed by session id, in an LRU with TTL eviction.
+    """
+
+    def __init__(self, max_sessions=CONVERSATION_MAX_SESSIONS, ttl_seconds=CONVERSATION_TTL_SECONDS,
+                 persistence=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.persistence = persistence
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_session(self, system_prompt):
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._put(session_id, [{'role': 'system', 'content': system_prompt}], time.time())
+        self._persist({'op': 'create', 'session_id': session_id, 'role': 'system', 'content': system_prompt})
+        return session_id
+
+    def get_history(self, session_id):
+        """
+        Returns the session's messages, or None if the session is unknown or has expired.
+        """
+        with self._lock:
+            entry = self._touch(session_id)
+            return list(entry[0]) if entry else None
+
+    def append(self, session_id, role, content):
+        with self._lock:
+            entry = self._touch(session_id)
+            if entry is None:
+                raise KeyError(session_id)
+            entry[0].append({'role': role, 'content': content})
+        self._persist({'op': 'append', 'session_id': session_id, 'role': role, 'content': content})
+
+    def delete(self, session_id):
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+        if removed:
+            self._persist({'op': 'delete', 'session_id': session_id})
+        return removed
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def load(self):
+        """
+        Rebuilds live sessions from the persistence log, skipping ones that have already expired.
+        """
+        if self.persistence is None:
+            return
+        now = time.time()
+        with self._lock:
+            for event in self.persistence.replay():
+                session_id = event['session_id']
+                if event['op'] == 'delete':
+                    self._sessions.pop(session_id, None)
+                    continue
+                if event['op'] == 'create':
+                    self._sessions.pop(session_id, None)
+                    self._put(session_id, [], event['ts'])
+                entry = self._sessions.get(session_id)
+                if entry is None:
+                    continue
+                entry[0].append({'role': event['role'], 'content': event['content']})
+                entry[1] = event['ts']
+                self._sessions.move_to_end(session_id)
+            for session_id in [key for key, entry in self._sessions.items() if now - entry[1] > self.ttl_seconds]:
+                del self._sessions[session_id]
+
+    def close(self):
+        if self.persistence is not None:
+            self.persistence.close()
+
+    def _persist(self, event):
+        if self.persistence is not None:
+            event['ts'] = time.time()
+            with self._lock:
+                self.persistence.write(event)
+
+    def _touch(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry[1] > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        entry[1] = now
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _put(self, session_id, history, last_access):
+        self._sessions[session_id] = [history, last_access]
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class RedisConversationStore:
+    """
+    Keeps the message histories in a Redis-protocol server, so every worker can continue every
+    conversation. Each session is a list of JSON messages that expires after ttl_seconds without
+    activity; capping the number of sessions is left to the server's maxmemory policy.
+    """
+
+    def __init__(self, client, ttl_seconds=CONVERSATION_TTL_SECONDS, prefix="conversation:"):
+        self.client = client
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.prefix = prefix
+
+    def create_session(self, system_prompt):
+        session_id = uuid.uuid4().hex
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.rpush(self._key(session_id), json.dumps({'role': 'system', 'content': system_prompt}))
+        pipeline.pexpire(self._key(session_id), self.ttl_ms)
+        pipeline.execute()
+        return session_id
+
+    def get_history(self, session_id):
+        """
+        Returns the session's messages, or None if the session is unknown or has expired.
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.lrange(self._key(session_id), 0, -1)
+        pipeline.pexpire(self._key(session_id), self.ttl_ms)
+        messages, _ = pipeline.execute()
+        return [json.loads(message) for message in messages] if messages else None
+
+    def append(self, session_id, role, content):
+        pipeline = self.client.pipeline(transaction=False)
+        # RPUSHX only appends to an existing list, so an expired session is not resurrected
+        pipeline.rpushx(self._key(session_id), json.dumps({'role': role, 'content': content}))
+        pipeline.pexpire(self._key(session_id), self.ttl_ms)
+        length, _ = pipeline.execute()
+        if not length:
+            raise KeyError(session_id)
+
+    def delete(self, session_id):
+        return self.client.delete(self._key(session_id)) > 0
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+    def load(self):
+        # The server keeps the sessions; nothing to replay
+        pass
+
+    def close(self):
+        self.client.close()
+
+    def _key(self, session_id):
+        return self.prefix + session_id
+
+
+def create_conversation_store():
+    if SHARED_STORE_URL:
+        return RedisConversationStore(redis_client())
+    return ConversationStore(
+        persistence=AppendOnlyHistoryLog(CONVERSATION_LOG_PATH) if CONVERSATION_LOG_PATH else None
+    )
+
+
+conversation_store = create_conversation_store()
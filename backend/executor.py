@@ -0,0 +1,55 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# Maximum number of blocking STT/LLM/TTS calls that may run at the same time.
+# Calls beyond this limit wait in the executor queue instead of stalling the event loop.
+VOICE_PIPELINE_CONCURRENCY = int(os.getenv('VOICE_PIPELINE_CONCURRENCY', '16'))
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=VOICE_PIPELINE_CONCURRENCY, thread_name_prefix="voice-pipeline")
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking SDK call on the bounded voice pipeline executor and awaits its result. The call
+    sees the caller's context variables, such as the request's trace id.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+class LoopLocalLock:
+    """
+    An asyncio.Lock for the running event loop. asyncio.Lock is bound to the loop it was first used
+    on, and tests and benchmarks may run several loops one after another.
+    """
+
+    def __init__(self):
+        self._lock = None
+        self._loop = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        await self._lock.acquire()
+
+    async def __aexit__(self, *exc):
+        self._lock.release()
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from context_window import parse_bot_reply
+from observability import LLM_CACHE_REQUESTS, LLM_CACHE_SAVED_SECONDS
+
+# Number of bot replies kept; 0 turns the cache (and deduplication of identical requests) off
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000'))
+# Seconds a reply is reused for, at most; every availability change drops all of them earlier
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', '600'))
+# Replies that change bookings are always requested afresh
+WRITE_ACTIONS = {"schedule", "reschedule", "cancel"}
+
+
+def normalize_text(text):
+    """
+    Lower case without punctuation or repeated whitespace, so "Cancel my appointment." and
+    "cancel my appointment" from the recognizer share an entry.
+    """
+    return " ".join(re.sub(r"[^\w\s']", " ", (text or "").lower()).split())
+
+
+def cache_key(model, messages):
+    """
+    Hash of everything the reply depends on: the model, the system prompt (whitespace-normalized),
+    the availability context, the summary and recent turns of the conversation, and the new
+    question. What the patient said is normalized, in earlier turns as well.
+    """
+    system, *state, question = messages
+    state = [{"role": message["role"],
+              "content": normalize_text(message["content"]) if message["role"] == "user" else message["content"]}
+             for message in state]
+    parts = [model, " ".join(system["content"].split()), state, normalize_text(question["content"])]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def is_cacheable(answer):
+    reply = parse_bot_reply(answer)
+    return reply is not None and str(reply.get("action") or "").lower() not in WRITE_ACTIONS
+
+
+class Flight:
+    """
+    One upstream request that identical requests arriving meanwhile wait for.
+    """
+
+    def __init__(self, key, generation):
+        self.key = key
+        self.generation = generation
+        self.answer = None
+        self.seconds = 0.0
+        self.done = threading.Event()
+
+
+class LLMResponseCache:
+    """
+    Bot replies keyed on cache_key, in an LRU with TTL expiry. Concurrent identical requests are
+    single-flighted: the first one goes upstream and the others wait for its answer. Entries live
+    in this worker's memory only, and are all dropped when availability changes.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Bumped by invalidate(), so answers to requests started before a change are not stored
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """
+        Returns (answer, flight). answer is the cached reply, or the reply of an identical request
+        that was in flight, if there is one. Otherwise the caller requests the reply itself and must
+        pass its answer (None on failure) to release(flight, ...) afterwards; flight is None when no
+        other request depends on it.
+        """
+        if self.max_entries <= 0:
+            return None, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._served("hit", entry[1])
+                return entry[0], None
+            if entry is not None:
+                del self._entries[key]
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key, self.generation)
+                self.misses += 1
+                LLM_CACHE_REQUESTS.labels("miss").inc()
+                return None, flight
+
+        flight.done.wait()
+        if flight.answer is None:
+            # The other request failed or its reply must not be shared; ask independently
+            with self._lock:
+                self.misses += 1
+            LLM_CACHE_REQUESTS.labels("miss").inc()
+            return None, None
+        with self._lock:
+            self._served("coalesced", flight.seconds)
+        return flight.answer, None
+
+    def release(self, flight, answer=None, seconds=0.0):
+        """
+        Completes a request that missed: hands the answer to the identical requests waiting for it
+        and stores it, if it may be shared. An answer to a request made before availability last
+        changed still goes to the waiting requests, which were made with the same prompt, but is
+        not stored. Releasing a flight again has no effect.
+        """
+        if flight is None or flight.done.is_set():
+            return
+        if answer is not None and not is_cacheable(answer):
+            answer = None
+        with self._lock:
+            self._flights.pop(flight.key, None)
+            if answer is not None and flight.generation == self.generation:
+                self._entries[flight.key] = (answer, seconds, time.monotonic() + self.ttl_seconds)
+                self._entries.move_to_end(flight.key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        flight.answer, flight.seconds = answer, seconds
+        flight.done.set()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "entries": len(self._entries),
+        }
+
+    def _served(self, result, seconds):
+        # Called with the lock held; seconds is how long the reply originally took upstream
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.coalesced += 1
+        self.saved_seconds += seconds
+        LLM_CACHE_REQUESTS.labels(result).inc()
+        LLM_CACHE_SAVED_SECONDS.inc(seconds)
+
+
+llm_cache = LLMResponseCache()
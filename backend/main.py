@@ -1,7 +1,8 @@
+import asyncio
 import os
 
-from fastapi import FastAPI, HTTPException, File, UploadFile, Depends
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, File, Form, Request, UploadFile, Depends, WebSocket
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import schemas
@@ -9,13 +10,28 @@ from schemas import MainTimeSlotModel, TimeSlotModel, UserAppointmentModel
 import models
 import services
 from typing import List
-import sqlitedatabase
+import migrations
+from migrations import MIGRATE_ON_STARTUP
 from sqlitedatabase import database, engine
-
-sqlitedatabase.Base.metadata.create_all(bind=engine)
+from executor import run_blocking, shutdown_executor
+from clients import CLIENT_STARTUP, client_registry
+from context_window import prompt_tokens
+from conversation_store import conversation_store
+from observability import METRICS_CONTENT_TYPE, ObservabilityMiddleware, logger, render_metrics, start_logging, stop_logging
+from shared_store import SHARED_STORE_URL
+from tts_cache import TTS_PREWARM, tts_cache
+from llm_cache import llm_cache
+from admission import AdmissionMiddleware, admin_admission, voice_admission
+from resilience import upstream_policies
+
+start_logging()
 
 app = FastAPI()
+# Task creating the provider clients in the background (CLIENT_STARTUP=background)
+client_startup = None
 
+# Innermost, so rejections still carry CORS headers and are counted in the request metrics
+app.add_middleware(AdmissionMiddleware)
 # CORS middleware to allow requests from our React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -23,19 +39,104 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Retry-After"],
 )
+# Outermost, so request metrics and the trace id cover everything below it
+app.add_middleware(ObservabilityMiddleware)
 
 os.getenv('GOOGLE_APPLICATION_CREDENTIALS', "./../gc-speech.json")
 
 
 @app.on_event("startup")
 async def startup():
+    global client_startup
+    start_logging()
+    if int(os.getenv('WEB_CONCURRENCY', '1')) > 1 and not SHARED_STORE_URL:
+        logger.warning("Running several workers without SHARED_STORE_URL; conversations started on "
+                       "one worker are unknown to the others.")
+    if MIGRATE_ON_STARTUP:
+        await run_blocking(migrations.migrate, engine)
     await database.connect()
+    await services.load_availability()
+    conversation_store.load()
+    if CLIENT_STARTUP == "blocking":
+        await run_blocking(client_registry.start)
+    elif CLIENT_STARTUP == "background":
+        # Serving starts right away; /readyz reports ready once the clients (and their SDKs) are loaded
+        client_startup = asyncio.ensure_future(run_blocking(client_registry.start))
+    if TTS_PREWARM:
+        asyncio.ensure_future(services.prewarm_tts_cache())
 
 
 @app.on_event("shutdown")
 async def shutdown():
     await database.disconnect()
+    client_registry.close()
+    shutdown_executor()
+    conversation_store.close()
+    stop_logging()
+
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and serving requests
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: the database answers and the provider clients have been created (or failed to be,
+    # as /health/clients/ shows; the API then still serves what does not need them)
+    checks = {"database": "ok", "clients": "ok"}
+    try:
+        await database.fetch_val("SELECT 1")
+    except Exception as e:
+        checks["database"] = str(e)
+    if client_startup is not None and not client_startup.done():
+        checks["clients"] = "starting"
+    ready = all(check == "ok" for check in checks.values())
+    return JSONResponse({"ready": ready, **checks}, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format: per-stage latency histograms, request counters and in-flight gauges
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/health/clients/")
+async def client_health():
+    return await run_blocking(client_registry.health)
+
+
+@app.get("/health/tts-cache/")
+async def tts_cache_stats():
+    return tts_cache.stats()
+
+
+@app.get("/health/llm-cache/")
+async def llm_cache_stats():
+    # Hit rate (including requests coalesced onto an identical one in flight) and upstream time saved
+    return llm_cache.stats()
+
+
+@app.get("/health/upstreams/")
+async def upstream_stats():
+    # Circuit state, call outcomes, retries and hedges per provider
+    return {policy.name: policy.stats() for policy in upstream_policies}
+
+
+@app.get("/health/admission/")
+async def admission_stats():
+    return {"voice": voice_admission.stats(), "admin": admin_admission.stats()}
+
+
+@app.get("/health/prompt-tokens/")
+async def prompt_token_stats(session_id: str = None):
+    # Per-request prompt sizes of one conversation, or the totals across all of them
+    if session_id:
+        return prompt_tokens.session(session_id)
+    return prompt_tokens.stats()
 
 
 @app.post("/timeslots/")
@@ -43,9 +144,32 @@ async def create_time_slot(time_slot: models.MainTimeSlot):
     return await services.create_time_slot(time_slot=time_slot)
 
 
+@app.post("/timeslots/bulk/")
+async def create_time_slots_bulk(request: models.BulkTimeSlotRequest):
+    return await services.create_time_slots_bulk(request)
+
+
 @app.get("/timeslots/")
-async def read_time_slots():
-    return await services.get_time_slots()
+async def read_time_slots(request: Request, response: Response, start_date: str = None, end_date: str = None,
+                          limit: int = None, cursor: str = None, include_counts: bool = False):
+    # Unchanged calendars are revalidated with 304 before any query runs
+    etag = await services.time_slots_etag(start_date=start_date, end_date=end_date, limit=limit, cursor=cursor,
+                                          include_counts=include_counts)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if services.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    page = await services.get_time_slots(start_date, end_date, limit, cursor, include_counts)
+    response.headers.update(headers)
+    if page["next_cursor"]:
+        # The body stays a plain list, so the next page's cursor travels in a header
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["time_slots"]
+
+
+@app.get("/timeslots/nearest/")
+async def read_nearest_time_slots(date: str, time: str, limit: int = 5):
+    # Free slots closest to date/time (any day), and the next ones at or after it
+    return await services.find_nearest_slots(date, time, limit)
 
 
 @app.post("/user_appointments/")
@@ -54,8 +178,13 @@ async def create_user_appointment(appointment: models.UserAppointment):
 
 
 @app.post("/transcribe/")
-async def transcribe_audio(file: UploadFile = File(...)):
-    return await services.converse_with_voice_bot(file)
+async def transcribe_audio(file: UploadFile = File(...), session_id: str = Form(None)):
+    return await services.converse_with_voice_bot(file, session_id)
+
+
+@app.websocket("/ws/transcribe/")
+async def transcribe_audio_stream(websocket: WebSocket, session_id: str = None):
+    await services.converse_over_websocket(websocket, session_id)
 
 
 @app.post("/synthesize/")
@@ -69,5 +198,5 @@ async def delete_time_slot(timeslot_id: int):
 
 
 @app.post("/clear-history/")
-async def clear_history():
-    return await services.clear_history()
+async def clear_history(session_id: str = None):
+    return await services.clear_history(session_id)
@@ -0,0 +1,30 @@
+import os
+
+from sqlalchemy import inspect
+
+from observability import logger, start_logging
+from sqlitedatabase import Base, engine
+import schemas  # noqa: F401  (registers the tables on Base.metadata)
+
+# Migrate when the app starts. Deployments that run "python -m migrations" as a separate step
+# first (as the Docker image does) set this to 0.
+MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', '1') != '0'
+
+
+def migrate(bind=engine):
+    """
+    Brings the schema up to date. create_all only creates missing tables, so indexes added to
+    existing tables are created here as well; every step is idempotent.
+    """
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logger.info("Creating index", extra={"index": index.name})
+                index.create(bind=bind)
+
+
+if __name__ == "__main__":
+    start_logging()
+    migrate()
@@ -1,3 +1,5 @@
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel
 
 
@@ -23,3 +25,20 @@ class MainTimeSlot(BaseModel):
 
 class SynthesizeRequest(BaseModel):
     text: str
+
+
+class TimeRange(BaseModel):
+    start_time: str
+    end_time: str
+
+
+class WeeklyTemplate(BaseModel):
+    start_date: str
+    end_date: str
+    # Lower-case weekday name ("monday" ... "sunday") to the ranges the doctor is available that day
+    days: Dict[str, List[TimeRange]]
+
+
+class BulkTimeSlotRequest(BaseModel):
+    time_slots: List[MainTimeSlot] = []
+    weekly_template: Optional[WeeklyTemplate] = None
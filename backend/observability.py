@@ -0,0 +1,196 @@
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.routing import Match
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Set (to an empty, writable directory) when running several workers, so /metrics sums all of them
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+logger = logging.getLogger("voicebot")
+
+# Set per HTTP request or WebSocket by ObservabilityMiddleware, and carried into executor threads
+trace_id = contextvars.ContextVar("trace_id", default=None)
+
+# Voice pipeline stages: upload_read, vad, stt, prompt_build, llm, json_parse, db_action, tts
+STAGE_SECONDS = Histogram(
+    "voice_stage_seconds", "Time spent in each voice pipeline stage.", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter("http_requests_total", "Requests handled, by endpoint and status.", ["method", "endpoint", "status"])
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request duration, including streamed bodies.",
+                            ["method", "endpoint"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled.", ["endpoint"],
+                  multiprocess_mode="livesum")
+# result is hit (cached reply), coalesced (shared an identical request in flight) or miss
+LLM_CACHE_REQUESTS = Counter("llm_cache_requests_total", "Bot reply lookups in the LLM response cache.", ["result"])
+LLM_CACHE_SAVED_SECONDS = Counter("llm_cache_saved_seconds_total",
+                                  "Upstream completion time saved by serving cached or coalesced replies.")
+
+# pool is voice (transcribe/synthesize) or admin (timeslots); see admission.py
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Admitted requests currently running, by pool.", ["pool"],
+                            multiprocess_mode="livesum")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Requests waiting for admission, by pool.", ["pool"],
+                              multiprocess_mode="livesum")
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time requests waited in the admission queue.", ["pool"],
+                                   buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+# reason is queue_full (429) or timeout (503)
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests turned away by admission control.",
+                             ["pool", "reason"])
+
+# provider is stt, llm or tts; see resilience.py. outcome is ok, error (a non-retryable error),
+# failed (out of attempts or time) or rejected (circuit open)
+UPSTREAM_CALLS = Counter("upstream_calls_total", "Provider calls made through the resilience layer.",
+                         ["provider", "outcome"])
+UPSTREAM_RETRY_ATTEMPTS = Counter("upstream_retries_total",
+                                  "Provider call attempts repeated after a retryable failure.", ["provider"])
+# result is sent, or won when the duplicate answered first
+UPSTREAM_HEDGES = Counter("upstream_hedges_total", "Duplicate provider requests sent after a slow first attempt.",
+                          ["provider", "result"])
+# 0 closed, 1 half-open (one trial call allowed), 2 open (failing fast)
+CIRCUIT_STATE = Gauge("upstream_circuit_state", "State of each provider's circuit breaker.", ["provider"],
+                      multiprocess_mode="max")
+
+_STANDARD_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, trace_id and any `extra` fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        entry.update({key: value for key, value in vars(record).items()
+                      if key not in _STANDARD_RECORD_FIELDS and key not in entry})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TraceIdFilter(logging.Filter):
+    # Runs in the caller's thread before the record is queued, while the request's context is current
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def start_logging(stream=sys.stdout):
+    """
+    Routes the app's logs through a queue, so request handlers never block on writing them; a
+    background thread formats and writes them as JSON lines.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(TraceIdFilter())
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def stop_logging():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    logger.propagate = True
+
+
+@contextmanager
+def span(stage, **fields):
+    """
+    Times a pipeline stage into voice_stage_seconds and logs it with the current trace id.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        logger.debug("span", extra={"stage": stage, "ms": round(elapsed * 1000, 2), **fields})
+
+
+def render_metrics():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def route_path(scope):
+    """
+    The matching route's path template (e.g. /timeslots/{timeslot_id}/), so metric labels stay bounded.
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class ObservabilityMiddleware:
+    """
+    Assigns every request and WebSocket a trace id (taken from X-Request-ID when the caller sends
+    one, and returned as X-Trace-Id), and records request counts, durations and in-flight gauges.
+    Streamed response bodies are included in the duration.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        token = trace_id.set(headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16])
+        method = scope.get("method", "WS")
+        endpoint = route_path(scope)
+        status = "ws" if scope["type"] == "websocket" else "500"
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace_id.get().encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        IN_FLIGHT.labels(endpoint).inc()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            IN_FLIGHT.labels(endpoint).dec()
+            REQUESTS.labels(method, endpoint, status).inc()
+            REQUEST_SECONDS.labels(method, endpoint).observe(time.perf_counter() - started)
+            trace_id.reset(token)
@@ -1,14 +1,105 @@
 import json
-import os
+import time
 
-import openai
 from dotenv import load_dotenv
 
-# Load environment variables from a .env file
+from clients import client_registry
+from context_window import context_window, message_tokens, prompt_tokens
+from conversation_store import conversation_store
+from llm_cache import cache_key, llm_cache
+from observability import logger, span
+from resilience import llm_policy
+
+# Load environment variables from a .env file; the OpenAI client reads its key from OPENAI_API_KEY
 load_dotenv()
 
-# Set your OpenAI API key in an environment variable named 'OPENAI_API_KEY'
-openai.api_key = os.getenv('OPENAI_API_KEY')
+
+class JsonFieldStream:
+    """
+    Incrementally extracts one top-level string field from a JSON object arriving in pieces, so the
+    text can be used before the rest of the object (or its closing brace) has been generated.
+    """
+    ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field):
+        self.field = field
+        self.depth = 0
+        self.in_string = False
+        self.is_key = False
+        self.capturing = False
+        self.expect_value = False
+        self.escape = None
+        # First half of a \uXXXX\uXXXX surrogate pair, until the second half arrives
+        self.high_surrogate = None
+        self.last_key = None
+        self.key_chars = []
+
+    def feed(self, text):
+        """
+        Consumes the next piece of the JSON document and returns the newly decoded characters of the
+        target field's value (an empty string when there are none).
+        """
+        emitted = []
+        for char in text:
+            if self.in_string:
+                decoded = self._string_char(char)
+                if decoded is None:
+                    continue
+                if self.capturing:
+                    emitted.append(decoded)
+                elif self.is_key:
+                    self.key_chars.append(decoded)
+            elif char == '"':
+                self.in_string = True
+                self.is_key = self.depth == 1 and not self.expect_value
+                self.capturing = self.depth == 1 and self.expect_value and self.last_key == self.field
+                self.key_chars = []
+                self.expect_value = False
+            elif char in '{[':
+                self.depth += 1
+                if self.depth == 2:
+                    self.expect_value = False
+            elif char in '}]':
+                self.depth -= 1
+            elif self.depth == 1 and char == ':':
+                self.expect_value = True
+            elif self.depth == 1 and char == ',':
+                self.expect_value = False
+        return "".join(emitted)
+
+    def _string_char(self, char):
+        # Returns the decoded character, or None while inside an escape sequence or at the closing quote
+        if self.escape is not None:
+            if self.escape == "" and char != 'u':
+                self.escape = None
+                return self._code_point(ord(self.ESCAPES.get(char, char)))
+            self.escape += char
+            if len(self.escape) == 5:
+                code, self.escape = self.escape[1:], None
+                return self._code_point(int(code, 16))
+            return None
+        if char == '\\':
+            self.escape = ""
+            return None
+        if char == '"':
+            self.in_string = False
+            if self.is_key:
+                self.last_key = "".join(self.key_chars)
+            self.capturing = False
+            self.high_surrogate = None
+            return None
+        return self._code_point(ord(char))
+
+    def _code_point(self, code):
+        # Characters outside the BMP (emoji, some names) are escaped as a pair of surrogates, which
+        # are only decoded together; a lone one becomes U+FFFD, as it cannot be encoded
+        high, self.high_surrogate = self.high_surrogate, None
+        if 0xD800 <= code < 0xDC00:
+            self.high_surrogate = code
+            return "\ufffd" if high is not None else None
+        if 0xDC00 <= code < 0xE000:
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)) if high is not None else "\ufffd"
+        return chr(code) if high is None else "\ufffd" + chr(code)
 
 
 class OpenAIBot:
@@ -16,51 +107,139 @@ class OpenAIBot:
     A chatbot class that interfaces with OpenAI's GPT model to conduct conversations.
     """
 
-    def __init__(self, initial_prompt, model="gpt-4-0125-preview"):
+    def __init__(self, session_id, context=None, model="gpt-4-0125-preview", store=conversation_store,
+                 window=context_window, tracker=prompt_tokens, cache=llm_cache):
         self.model = model
-        self.initial_prompt = initial_prompt
-        self.history = []
+        self.session_id = session_id
+        # Per-turn system context, such as the rendered availability, sent after the static prompt
+        self.context = context
+        self.store = store
+        self.window = window
+        self.tracker = tracker
+        self.cache = cache
+
+    def messages(self, question):
+        """
+        The chat messages for a new question: the session's system prompt, context, a summary of
+        older turns and the most recent ones, within the window's token budget.
+        """
+        history = self.store.get_history(self.session_id)
+        if history is None:
+            raise KeyError(self.session_id)
+        return self.window.build(history, question, self.context)
+
+    def track(self, messages, response=None):
+        usage = getattr(response, "usage", None)
+        self.tracker.record(self.session_id, message_tokens(messages), usage.prompt_tokens if usage else None)
 
     def add_to_history(self, role, content):
-        self.history.append({'role': role, 'content': content})
-        file_path = "./history.json"
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(self.history, file, ensure_ascii=False, indent=4)
+        self.store.append(self.session_id, role, content)
 
     @staticmethod
     def ensure_dict(answer):
         # If answer is already a dict, return it directly.
-        if answer[0] == "`":
-            answer = answer.strip().removeprefix("```json\n").removesuffix("\n```")
+        if isinstance(answer, dict):
+            return answer
+        answer = (answer or "").strip()
+        if answer.startswith("`"):
+            answer = answer.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
         # If answer is a string, try parsing it as JSON.
         try:
-            return json.loads(answer)
+            parsed = json.loads(answer)
         except ValueError as e:
-            # Handle the case where parsing fails.
-            print(f"Failed to parse 'answer' as JSON: {e}")
+            # Handle the case where parsing fails, including an empty completion.
+            logger.warning("Failed to parse 'answer' as JSON", extra={"error": str(e), "characters": len(answer)})
             # Return a default structure or raise an error as appropriate.
             return {"error": "Failed to parse response"}
+        if not isinstance(parsed, dict):
+            logger.warning("Answer is not a JSON object", extra={"type": type(parsed).__name__})
+            return {"error": "Failed to parse response"}
+        return parsed
+
+    @staticmethod
+    def client(timeout):
+        # The resilience layer owns timeouts and retries, so the SDK's are replaced
+        return client_registry.openai.with_options(timeout=timeout, max_retries=0)
+
+    def complete(self, messages, tools=None):
+        """
+        Sends one chat completion request and returns the assistant message, which may carry tool calls.
+        """
+        options = {"tools": tools} if tools else {}
+        with span("llm"):
+            response = llm_policy.call(lambda timeout: self.client(timeout).chat.completions.create(
+                model=self.model,
+                messages=messages,
+                **options
+            ))
+        self.track(messages, response)
+        return response.choices[0].message
+
+    def ask_stream(self, question):
+        """
+        Yields the answer's content deltas as the model generates them, then records the turn in the
+        history. self.answer holds the full text once the generator is exhausted.
+        """
+        self.answer = ""
+        parts = []
+        flight = None
+        try:
+            messages = self.messages(question)
+            cached, flight = self.cache.lookup(cache_key(self.model, messages))
+            if cached is not None:
+                parts.append(cached)
+                yield cached
+            else:
+                started = time.perf_counter()
+                with span("llm", streamed=True):
+                    # Retried until the stream opens; a duplicate stream would have to be torn down, so no hedging
+                    stream = llm_policy.call(lambda timeout: self.client(timeout).chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        stream=True
+                    ), hedge=False)
+                    self.track(messages)
+                    for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                self.cache.release(flight, "".join(parts), time.perf_counter() - started)
+        except Exception:
+            logger.exception("Streamed completion failed")
+            self.answer = '{"message": "I am sorry, I couldn\'t process that request."}'
+            return
+        finally:
+            # Wakes up identical requests waiting on this one if it failed or was abandoned
+            self.cache.release(flight)
+        self.answer = "".join(parts)
+        self.add_to_history('user', question)
+        self.add_to_history('bot', self.answer)
 
     def ask(self, question):
+        flight = None
         try:
-            response = openai.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.initial_prompt},
-                    {"role": "user", "content": question},
-                ]
-            )
-            answer = response.choices[0].message.content
+            messages = self.messages(question)
+            # Identical turns (same prompt, availability, conversation and question) share one reply
+            answer, flight = self.cache.lookup(cache_key(self.model, messages))
+            if answer is None:
+                started = time.perf_counter()
+                with span("llm"):
+                    response = llm_policy.call(lambda timeout: self.client(timeout).chat.completions.create(
+                        model=self.model,
+                        messages=messages
+                    ))
+                self.track(messages, response)
+                answer = response.choices[0].message.content
+                self.cache.release(flight, answer, time.perf_counter() - started)
             self.add_to_history('user', question)
             self.add_to_history('bot', answer)
-            print(type(answer))
-            print(answer)
-            answer_dict = self.ensure_dict(answer)
+            logger.debug("LLM answer", extra={"answer": answer})
+            with span("json_parse"):
+                answer_dict = self.ensure_dict(answer)
             return answer_dict
-        except Exception as e:
-            print(f"An error occurred: {e}")
+        except Exception:
+            logger.exception("Completion failed")
             json_string = '{"message": "I am sorry, I couldn\'t process that request."}'
             return json.loads(json_string)
-
-
-
+        finally:
+            self.cache.release(flight)
@@ -0,0 +1,273 @@
+import concurrent.futures
+import contextlib
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from executor import VOICE_PIPELINE_CONCURRENCY
+from observability import CIRCUIT_STATE, UPSTREAM_CALLS, UPSTREAM_HEDGES, UPSTREAM_RETRY_ATTEMPTS, logger
+
+# Seconds each pipeline stage may spend on its provider, across all attempts and hedges
+STT_DEADLINE_SECONDS = float(os.getenv('STT_DEADLINE_SECONDS', '10'))
+LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', '20'))
+TTS_DEADLINE_SECONDS = float(os.getenv('TTS_DEADLINE_SECONDS', '8'))
+# Seconds a streaming recognition (/ws/transcribe/) may last, including the time the patient talks
+STT_STREAM_DEADLINE_SECONDS = float(os.getenv('STT_STREAM_DEADLINE_SECONDS', '60'))
+# Further attempts after a retryable failure (timeouts, connection errors, 429 and 5xx responses)
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+# Backoff before retry n is drawn uniformly from [0, UPSTREAM_BACKOFF_SECONDS * 2^n]
+UPSTREAM_BACKOFF_SECONDS = float(os.getenv('UPSTREAM_BACKOFF_SECONDS', '0.2'))
+# A duplicate request is sent once an attempt has taken longer than this percentile of the
+# provider's recent call latencies; 0 turns hedging off
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+# Successful calls observed before hedging starts, and how many recent ones the percentile covers
+HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_WINDOW = 200
+# Consecutive failed calls that open a provider's circuit, and the seconds it then fails fast for
+# before letting one trial call through
+CIRCUIT_FAILURES = int(os.getenv('CIRCUIT_FAILURES', '5'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+
+# Matched against the exception's class hierarchy by name, so the SDKs need not be imported here
+RETRYABLE_ERRORS = {
+    "TimeoutError", "ConnectionError",
+    # google.api_core.exceptions
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "TooManyRequests", "ResourceExhausted",
+    # openai
+    "APITimeoutError", "APIConnectionError", "RateLimitError",
+}
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+# Attempts run here, so a caller can stop waiting at its deadline or send a hedge while one is stuck
+_attempts = concurrent.futures.ThreadPoolExecutor(max_workers=2 * VOICE_PIPELINE_CONCURRENCY,
+                                                  thread_name_prefix="upstream")
+
+
+class UpstreamUnavailable(Exception):
+    """
+    A provider call that failed fast because the provider's circuit is open, or that ran out of
+    attempts or time. retry_after is a hint in seconds for the client.
+    """
+
+    def __init__(self, provider, detail, retry_after=1):
+        super().__init__(f"{provider}: {detail}")
+        self.provider = provider
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class UpstreamTimeout(TimeoutError):
+    pass
+
+
+def is_retryable(error):
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return True
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive failed calls and then rejects calls for open_seconds. After
+    that one trial call goes through (half-open): its success closes the circuit again, and its
+    failure reopens it.
+    """
+
+    def __init__(self, name, failures=CIRCUIT_FAILURES, open_seconds=CIRCUIT_OPEN_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.opened = 0
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._set("half_open")
+                self._trial_running = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def retry_after(self):
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._trial_running = False
+            if self.state != "closed":
+                self._set("closed")
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._set("open")
+                logger.warning("Circuit opened", extra={"provider": self.name, "failures": self._consecutive})
+
+    def _set(self, state):
+        # Called with the lock held
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(CIRCUIT_STATES[state])
+
+
+class UpstreamPolicy:
+    """
+    Deadline, retries with jittered exponential backoff, hedging and a circuit breaker for the
+    calls to one provider.
+    """
+
+    def __init__(self, name, deadline, retries=UPSTREAM_RETRIES, backoff=UPSTREAM_BACKOFF_SECONDS,
+                 hedge_percentile=HEDGE_PERCENTILE, hedge_min_samples=HEDGE_MIN_SAMPLES):
+        self.name = name
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(name)
+        self.outcomes = {"ok": 0, "error": 0, "failed": 0, "rejected": 0}
+        self.retried = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self._latencies = deque(maxlen=HEDGE_WINDOW)
+
+    def call(self, request, idempotent=True, hedge=True):
+        """
+        Returns request(timeout), where timeout is the time left before the deadline, for the SDK
+        call to pass on. Retryable failures are retried (idempotent requests only) and slow attempts
+        hedged until the deadline; UpstreamUnavailable is raised when that fails, or at once while
+        the circuit is open. Other errors are raised as they are.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise UpstreamUnavailable(self.name, "circuit open", self.breaker.retry_after())
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = self._attempt(request, deadline, hedge and idempotent)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered, so it is up; the request itself was wrong
+                    self.breaker.success()
+                    self._count("error")
+                    raise
+                wait = random.uniform(0, self.backoff * 2 ** attempt)
+                if not idempotent or attempt >= self.retries or time.monotonic() + wait >= deadline:
+                    self.breaker.failure()
+                    self._count("failed")
+                    logger.warning("Upstream call failed", extra={"provider": self.name, "attempts": attempt + 1,
+                                                                  "error": repr(e)})
+                    raise UpstreamUnavailable(self.name, repr(e), self.breaker.retry_after() or 1) from e
+                attempt += 1
+                self.retried += 1
+                UPSTREAM_RETRY_ATTEMPTS.labels(self.name).inc()
+                time.sleep(wait)
+                continue
+            self.breaker.success()
+            self._count("ok")
+            return result
+
+    @contextlib.contextmanager
+    def guard(self):
+        """
+        Circuit breaker and outcome accounting for a call that cannot go through call(), such as a
+        streaming recognition, whose audio cannot be replayed for a retry or a hedge. Raises
+        UpstreamUnavailable while the circuit is open; the caller applies its own deadline.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise UpstreamUnavailable(self.name, "circuit open", self.breaker.retry_after())
+        try:
+            yield
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.failure()
+                self._count("failed")
+            else:
+                self.breaker.success()
+                self._count("error")
+            raise
+        self.breaker.success()
+        self._count("ok")
+
+    def hedge_delay(self):
+        if self.hedge_percentile <= 0 or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))]
+
+    def stats(self):
+        hedge_delay = self.hedge_delay()
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "calls": dict(self.outcomes),
+            "retries": self.retried,
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "hedge_after_ms": round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+        }
+
+    def _attempt(self, request, deadline, hedge):
+        # One attempt, plus a duplicate if it is still running after the hedge delay; the first
+        # to succeed wins and the other is left to finish (its timeout bounds it) unobserved
+        started = time.monotonic()
+        hedge_delay = self.hedge_delay() if hedge else None
+        hedge_at = started + hedge_delay if hedge_delay is not None else None
+        running = [self._submit(request, deadline)]
+        first = running[0]
+        error = None
+        while running:
+            now = time.monotonic()
+            if now >= deadline:
+                raise UpstreamTimeout(f"no response within {self.deadline}s")
+            wake_at = min(deadline, hedge_at) if hedge_at is not None else deadline
+            done, _ = concurrent.futures.wait(running, timeout=max(0.0, wake_at - now),
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                running.remove(future)
+                if future.exception() is None:
+                    self._latencies.append(time.monotonic() - started)
+                    if future is not first:
+                        self.hedges_won += 1
+                        UPSTREAM_HEDGES.labels(self.name, "won").inc()
+                    return future.result()
+                error = future.exception()
+            if hedge_at is not None and time.monotonic() >= hedge_at and first in running:
+                hedge_at = None
+                self.hedges += 1
+                UPSTREAM_HEDGES.labels(self.name, "sent").inc()
+                running.append(self._submit(request, deadline))
+        raise error
+
+    def _submit(self, request, deadline):
+        # The request sees the caller's context variables, such as the trace id
+        context = contextvars.copy_context()
+        return _attempts.submit(context.run, request, max(0.001, deadline - time.monotonic()))
+
+    def _count(self, outcome):
+        self.outcomes[outcome] += 1
+        UPSTREAM_CALLS.labels(self.name, outcome).inc()
+
+
+stt_policy = UpstreamPolicy("stt", STT_DEADLINE_SECONDS)
+llm_policy = UpstreamPolicy("llm", LLM_DEADLINE_SECONDS)
+tts_policy = UpstreamPolicy("tts", TTS_DEADLINE_SECONDS)
+upstream_policies = (stt_policy, llm_policy, tts_policy)
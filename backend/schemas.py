@@ -14,6 +14,15 @@ class TimeSlotModel(Base):
     # Relationship (optional, for ORM use)
     appointments = relationship("UserAppointmentModel", back_populates="timeslot")
 
+    __table_args__ = (
+        # Exact-slot lookups when booking, and date/time range scans when a main slot is deleted
+        sqlalchemy.Index("ix_time_slots_date_start_end_booked", "date", "start_time", "end_time", "is_booked"),
+        # Open availability by day, without the booked rows
+        sqlalchemy.Index("ix_time_slots_unbooked_date", "date", "start_time",
+                         sqlite_where=sqlalchemy.text("is_booked = 0"),
+                         postgresql_where=sqlalchemy.text("is_booked = false")),
+    )
+
 
 class UserAppointmentModel(Base):
     __tablename__ = "user_appointments"
@@ -22,7 +31,7 @@ class UserAppointmentModel(Base):
     date = sqlalchemy.Column(sqlalchemy.Date)
     start_time = sqlalchemy.Column(sqlalchemy.Time)
     end_time = sqlalchemy.Column(sqlalchemy.Time)
-    timeslot_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('time_slots.id'))
+    timeslot_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey('time_slots.id'), index=True)
 
     # Relationship (optional, for ORM use)
     timeslot = sqlalchemy.orm.relationship("TimeSlotModel", back_populates="appointments")
@@ -34,3 +43,8 @@ class MainTimeSlotModel(Base):
     date = sqlalchemy.Column(sqlalchemy.Date)
     start_time = sqlalchemy.Column(sqlalchemy.Time)
     end_time = sqlalchemy.Column(sqlalchemy.Time)
+
+    __table_args__ = (
+        # Overlap checks and lookups of a day's availability ranges
+        sqlalchemy.Index("ix_main_time_slots_date_start", "date", "start_time"),
+    )
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# redis://host:6379/0 (or any Redis-protocol server) to share conversations and availability
+# changes between worker processes and containers. Unset keeps all state in-process, which only
+# supports a single worker.
+SHARED_STORE_URL = os.getenv('SHARED_STORE_URL')
+# Threads making the blocking Redis round trips for the request handlers
+SHARED_STORE_THREADS = int(os.getenv('SHARED_STORE_THREADS', '8'))
+
+_store_io = ThreadPoolExecutor(max_workers=SHARED_STORE_THREADS, thread_name_prefix="shared-store")
+
+
+def redis_client(url=SHARED_STORE_URL):
+    # Imported lazily so single-worker deployments don't need the redis package
+    import redis
+
+    # RESP2 is understood by every Redis-protocol server; newer clients default to RESP3
+    return redis.Redis.from_url(url, decode_responses=True, protocol=2)
+
+
+async def store_call(func, *args):
+    """
+    Awaits func(*args), an operation on a shared store, from a request handler. With
+    SHARED_STORE_URL every operation is a network round trip, so it runs on the store's own threads
+    instead of blocking the event loop; the in-process stores answer directly.
+    """
+    if not SHARED_STORE_URL:
+        return func(*args)
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_store_io, partial(context.run, func, *args))
+
+
+class LocalChangeLog:
+    """
+    In-process version counter with the changes behind its most recent versions, for single-worker
+    deployments.
+    """
+
+    def __init__(self, max_entries):
+        self._value = 0
+        self._changes = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def get(self):
+        return self._value
+
+    def publish(self, change):
+        with self._lock:
+            self._value += 1
+            self._changes.append(change)
+            return self._value
+
+    def since(self, version):
+        """
+        Returns the current version and the changes published after `version`, oldest first, or
+        None in place of the changes when they are no longer all kept.
+        """
+        with self._lock:
+            return self._value, changes_after(list(self._changes), self._value, version)
+
+
+class RedisChangeLog:
+    """
+    Version counter and log of its most recent changes, shared by every worker connected to the
+    same Redis-protocol server. The counter and the log are updated in one transaction, so the
+    last entry of the log is always the change that produced the current version.
+    """
+
+    def __init__(self, client, key, max_entries):
+        self.client = client
+        self.key = key
+        self.log_key = key + ":log"
+        self.max_entries = max_entries
+
+    def get(self):
+        return int(self.client.get(self.key) or 0)
+
+    def publish(self, change):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.incr(self.key)
+        pipeline.rpush(self.log_key, json.dumps(change))
+        pipeline.ltrim(self.log_key, -self.max_entries, -1)
+        version, _, _ = pipeline.execute()
+        return version
+
+    def since(self, version):
+        """
+        Returns the current version and the changes published after `version`, oldest first, or
+        None in place of the changes when they are no longer all kept.
+        """
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.get(self.key)
+        pipeline.lrange(self.log_key, 0, -1)
+        current, entries = pipeline.execute()
+        current = int(current or 0)
+        return current, changes_after([json.loads(entry) for entry in entries], current, version)
+
+
+def changes_after(changes, current, version):
+    # changes[-1] produced the current version, changes[-2] the one before, and so on
+    behind = current - version
+    if behind < 0 or behind > len(changes):
+        return None
+    return changes[len(changes) - behind:]
+
+
+def shared_change_log(key, max_entries):
+    return RedisChangeLog(redis_client(), key, max_entries) if SHARED_STORE_URL else LocalChangeLog(max_entries)
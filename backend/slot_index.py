@@ -0,0 +1,170 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minute(time_obj):
+    return time_obj.hour * 60 + time_obj.minute
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def to_end_minute(time_obj):
+    # A range or slot ending at midnight ends at the end of its day
+    return to_minute(time_obj) or MINUTES_PER_DAY
+
+
+class SlotIndex:
+    """
+    Free appointment slots and availability ranges per date, as sorted arrays of (start, end)
+    minutes plus a sorted array of the dates that have free slots. Lookups bisect into them, so
+    overlap checks and next/nearest free slot searches take O(log n) plus the slots returned.
+    """
+
+    def __init__(self):
+        self._free = {}
+        self._days = []
+        self._ranges = {}
+
+    def load_free(self, free_slots):
+        """
+        Replaces the free slots with the given (date, start_time, end_time) rows.
+        """
+        free = {}
+        for date_obj, start_time_obj, end_time_obj in free_slots:
+            free.setdefault(date_obj, []).append((to_minute(start_time_obj), to_end_minute(end_time_obj)))
+        for slots in free.values():
+            slots.sort()
+        self._free = free
+        self._days = sorted(free)
+
+    def add_free(self, date_obj, start_time_obj, end_time_obj):
+        slot = (to_minute(start_time_obj), to_end_minute(end_time_obj))
+        slots = self._free.get(date_obj)
+        if slots is None:
+            self._free[date_obj] = [slot]
+            insort(self._days, date_obj)
+            return
+        position = bisect_left(slots, slot)
+        if position == len(slots) or slots[position] != slot:
+            slots.insert(position, slot)
+
+    def remove_free(self, date_obj, start_time_obj, end_time_obj):
+        """
+        Drops the free slots lying within [start_time, end_time) on the date: the booked slot, or
+        every slot of a deleted availability range.
+        """
+        slots = self._free.get(date_obj)
+        if slots is None:
+            return
+        start, end = to_minute(start_time_obj), to_end_minute(end_time_obj)
+        low = high = bisect_left(slots, (start,))
+        while high < len(slots) and slots[high][0] < end:
+            high += 1
+        slots[low:high] = [slot for slot in slots[low:high] if slot[1] > end]
+        if not slots:
+            del self._free[date_obj]
+            del self._days[bisect_left(self._days, date_obj)]
+
+    def load_ranges(self, ranges):
+        """
+        Replaces the availability ranges (main time slots) with the given (date, start_time, end_time) rows.
+        """
+        self._ranges = {}
+        for date_obj, start_time_obj, end_time_obj in ranges:
+            self.add_range(date_obj, start_time_obj, end_time_obj)
+
+    def add_range(self, date_obj, start_time_obj, end_time_obj):
+        ranges = self._ranges.setdefault(date_obj, [])
+        time_range = (to_minute(start_time_obj), to_end_minute(end_time_obj))
+        position = bisect_left(ranges, time_range)
+        if position == len(ranges) or ranges[position] != time_range:
+            ranges.insert(position, time_range)
+
+    def remove_range(self, date_obj, start_time_obj, end_time_obj):
+        ranges = self._ranges.get(date_obj, [])
+        time_range = (to_minute(start_time_obj), to_end_minute(end_time_obj))
+        position = bisect_left(ranges, time_range)
+        if position < len(ranges) and ranges[position] == time_range:
+            del ranges[position]
+        if not ranges:
+            self._ranges.pop(date_obj, None)
+
+    def overlap(self, date_obj, start_time_obj, end_time_obj):
+        """
+        Returns an existing (date, start_minute, end_minute) range overlapping the given one, or None.
+        Stored ranges never overlap each other, so only the neighbours of the insertion point can.
+        """
+        ranges = self._ranges.get(date_obj)
+        if not ranges:
+            return None
+        start, end = to_minute(start_time_obj), to_end_minute(end_time_obj)
+        position = bisect_left(ranges, (start,))
+        if position < len(ranges) and ranges[position][0] < end:
+            return (date_obj,) + ranges[position]
+        if position > 0 and ranges[position - 1][1] > start:
+            return (date_obj,) + ranges[position - 1]
+        return None
+
+    def next_free(self, date_obj, minute=0, limit=5, same_day=False):
+        """
+        The first `limit` free slots starting at or after `minute` on the date, continuing onto later
+        dates unless same_day, as (date, start_minute, end_minute).
+        """
+        return list(islice(self._forward(date_obj, minute, same_day), limit))
+
+    def nearest_free(self, date_obj, minute, limit=1, same_day=False):
+        """
+        The `limit` free slots whose start is closest to `minute` on the date, nearest first (the
+        earlier one on ties), looking at other dates too unless same_day.
+        """
+        target = date_obj.toordinal() * MINUTES_PER_DAY + minute
+
+        def distance(slot):
+            return abs(slot[0].toordinal() * MINUTES_PER_DAY + slot[1] - target)
+
+        later, earlier = self._forward(date_obj, minute, same_day), self._backward(date_obj, minute, same_day)
+        next_later, next_earlier = next(later, None), next(earlier, None)
+        nearest = []
+        while len(nearest) < limit and (next_later or next_earlier):
+            if next_later is None or (next_earlier is not None and distance(next_earlier) <= distance(next_later)):
+                slot, next_earlier = next_earlier, next(earlier, None)
+            else:
+                slot, next_later = next_later, next(later, None)
+            nearest.append(slot)
+        return nearest
+
+    def stats(self):
+        return {"days": len(self._days), "free_slots": sum(len(slots) for slots in self._free.values()),
+                "ranges": sum(len(ranges) for ranges in self._ranges.values())}
+
+    def _forward(self, date_obj, minute, same_day=False):
+        # Free slots from (date, minute) onwards, in order
+        day = bisect_left(self._days, date_obj)
+        position = bisect_left(self._free[date_obj], (minute,)) if date_obj in self._free else 0
+        last_day = len(self._days)
+        if same_day:
+            last_day = day + 1 if date_obj in self._free else day
+        while day < last_day:
+            current = self._days[day]
+            slots = self._free[current]
+            for start, end in islice(slots, position, None):
+                yield current, start, end
+            day, position = day + 1, 0
+
+    def _backward(self, date_obj, minute, same_day=False):
+        # Free slots starting before (date, minute), latest first
+        day = bisect_right(self._days, date_obj) - 1
+        position = bisect_left(self._free[date_obj], (minute,)) - 1 if date_obj in self._free else None
+        first_day = 0
+        if same_day:
+            first_day = day if date_obj in self._free else day + 1
+        while day >= first_day:
+            current = self._days[day]
+            slots = self._free[current]
+            for index in range(len(slots) - 1 if position is None else position, -1, -1):
+                yield (current,) + slots[index]
+            day, position = day - 1, None
@@ -0,0 +1,128 @@
+import abc
+import asyncio
+import os
+import queue
+
+from clients import client_registry
+from executor import run_blocking
+from resilience import STT_STREAM_DEADLINE_SECONDS, stt_policy
+
+# Encoding and sample rate of the chunks sent by MediaRecorder in the browser (WebM/Opus at 48 kHz)
+STREAMING_STT_SAMPLE_RATE = int(os.getenv('STREAMING_STT_SAMPLE_RATE', '48000'))
+
+
+class StreamingRecognizer(abc.ABC):
+    """
+    Interface for streaming speech-to-text backends. stream() consumes an async iterator of audio
+    chunks and yields {"type": "interim" | "final", "transcript": str} events as they are recognized,
+    or a last {"type": "error", "detail": str} event when recognition fails.
+    """
+
+    @abc.abstractmethod
+    def stream(self, audio_chunks):
+        """
+        An async generator of recognition events for the audio chunks.
+        """
+
+
+class GoogleStreamingRecognizer(StreamingRecognizer):
+    """
+    Bridges Google's blocking streaming_recognize call onto the event loop. Requests are fed from a
+    thread-safe queue and responses are handed back through an asyncio queue. The call goes through
+    the STT circuit breaker and ends with an error event once `deadline` seconds have passed.
+    """
+
+    def __init__(self, language_code="en-US", sample_rate_hertz=STREAMING_STT_SAMPLE_RATE, encoding="WEBM_OPUS",
+                 deadline=STT_STREAM_DEADLINE_SECONDS):
+        self.language_code = language_code
+        self.sample_rate_hertz = sample_rate_hertz
+        self.deadline = deadline
+        # Name of a speech.RecognitionConfig.AudioEncoding; the SDK is only imported once a stream starts
+        self.encoding = encoding
+        self._streaming_config = None
+
+    @property
+    def streaming_config(self):
+        if self._streaming_config is None:
+            from google.cloud import speech
+
+            self._streaming_config = speech.StreamingRecognitionConfig(
+                config=speech.RecognitionConfig(
+                    encoding=speech.RecognitionConfig.AudioEncoding[self.encoding],
+                    sample_rate_hertz=self.sample_rate_hertz,
+                    language_code=self.language_code,
+                ),
+                interim_results=True,
+                # Ends the stream as soon as the patient stops talking, so the bot can answer right away
+                single_utterance=True,
+            )
+        return self._streaming_config
+
+    async def stream(self, audio_chunks):
+        from google.cloud import speech
+
+        loop = asyncio.get_running_loop()
+        requests = queue.Queue()
+        events = asyncio.Queue()
+        deadline = loop.time() + self.deadline
+
+        def request_iterator():
+            while True:
+                chunk = requests.get()
+                if chunk is None:
+                    return
+                yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+        def recognize():
+            try:
+                with stt_policy.guard():
+                    responses = client_registry.speech.streaming_recognize(
+                        config=self.streaming_config, requests=request_iterator(), timeout=self.deadline
+                    )
+                    for response in responses:
+                        for result in response.results:
+                            if result.alternatives:
+                                event = {
+                                    "type": "final" if result.is_final else "interim",
+                                    "transcript": result.alternatives[0].transcript,
+                                }
+                                loop.call_soon_threadsafe(events.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, {"type": "error", "detail": str(e)})
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        async def feed():
+            async for chunk in audio_chunks:
+                requests.put(chunk)
+            requests.put(None)
+
+        recognizing = asyncio.ensure_future(run_blocking(recognize))
+        feeding = asyncio.ensure_future(feed())
+        try:
+            while True:
+                try:
+                    # A stalled stream must not hold the socket open past the deadline
+                    event = await asyncio.wait_for(events.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield {"type": "error", "detail": f"No transcript within {self.deadline:g}s"}
+                    break
+                if event is None:
+                    break
+                yield event
+        finally:
+            feeding.cancel()
+            requests.put(None)
+            # The SDK call ends at the same deadline; past it, the thread is left to finish on its own
+            await asyncio.wait({recognizing}, timeout=max(0.0, deadline - loop.time()))
+
+
+recognizer = GoogleStreamingRecognizer()
+
+
+def set_recognizer(new_recognizer):
+    """
+    Replaces the streaming backend used by the WebSocket endpoint, e.g. with a local fake.
+    """
+    global recognizer
+    recognizer = new_recognizer
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# The database is bound when sqlitedatabase is imported, so the tests get a throwaway SQLite file
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='walnut_tests_'), 'test.db')}"
+
+
+@pytest.fixture
+def run_with_database():
+    """
+    Runs a coroutine function against an empty, migrated database, with the in-memory availability
+    loaded from it.
+    """
+    import migrations
+    import services
+    from sqlitedatabase import Base, database, engine
+
+    migrations.migrate()
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+    async def connected(scenario):
+        await database.connect()
+        try:
+            await services.load_availability()
+            return await scenario()
+        finally:
+            await database.disconnect()
+
+    return lambda scenario: asyncio.run(connected(scenario))
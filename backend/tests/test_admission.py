@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def settle():
+    # Lets the waiting requests run up to their next await
+    await asyncio.sleep(0.01)
+
+
+def test_admits_up_to_max_in_flight():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=2, max_queue=0, queue_timeout=1)
+        await controller.acquire()
+        await controller.acquire()
+        assert controller.in_flight == 2
+        controller.release()
+        assert controller.in_flight == 1
+        assert controller.admitted == 2
+
+    run(scenario())
+
+
+def test_rejects_with_429_when_the_queue_is_full():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=5)
+        await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await settle()
+        with pytest.raises(Rejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+        controller.release()
+        await waiting
+        assert controller.rejected == 1
+
+    run(scenario())
+
+
+def test_rejects_with_503_when_the_wait_runs_out():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=4, queue_timeout=0.01)
+        await controller.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 503
+        assert controller.stats()["queued"] == 0
+        assert controller.in_flight == 1
+
+    run(scenario())
+
+
+def test_release_hands_the_slot_to_the_first_waiter():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=4, queue_timeout=5)
+        await controller.acquire()
+        order = []
+
+        async def request(name):
+            await controller.acquire()
+            order.append(name)
+
+        waiters = [asyncio.ensure_future(request(name)) for name in ("first", "second")]
+        await settle()
+        controller.release()
+        await settle()
+        assert order == ["first"]
+        assert controller.in_flight == 1
+        controller.release()
+        await asyncio.gather(*waiters)
+        assert order == ["first", "second"]
+
+    run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=4, queue_timeout=5)
+        await controller.acquire()
+        cancelled = asyncio.ensure_future(controller.acquire())
+        await settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        controller.release()
+        assert controller.in_flight == 0
+        assert controller.stats()["queued"] == 0
+
+    run(scenario())
+
+
+def test_slot_releases_on_error():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=0, queue_timeout=1)
+        with pytest.raises(ValueError):
+            async with controller.slot():
+                raise ValueError
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_zero_max_in_flight_turns_admission_off():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=0, max_queue=0, queue_timeout=1)
+        async with controller.slot():
+            async with controller.slot():
+                assert controller.in_flight == 0
+        assert controller.rejected == 0
+
+    run(scenario())
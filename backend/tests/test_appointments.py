@@ -0,0 +1,55 @@
+from datetime import date, time, timedelta
+
+from availability import availability
+import services
+from schemas import MainTimeSlotModel
+from sqlitedatabase import database
+
+DAY = date.today() + timedelta(days=3)
+
+
+async def add_range(start, end):
+    await services.insert_main_time_slots([(DAY, start, end)])
+    query = MainTimeSlotModel.__table__.select().where(MainTimeSlotModel.date == DAY,
+                                                       MainTimeSlotModel.start_time == start)
+    return (await database.fetch_one(query))["id"]
+
+
+def free_slots():
+    return availability.index.next_free(DAY, same_day=True, limit=50)
+
+
+def test_book_and_cancel(run_with_database):
+    async def scenario():
+        await add_range(time(9, 0), time(10, 0))
+        booked = await services.book_appointment("Ann", DAY.isoformat(), "09:30")
+        assert "error" not in booked
+        assert free_slots() == [(DAY, 540, 570)]
+
+        assert "error" not in await services.cancel_appointment("Ann")
+        assert free_slots() == [(DAY, 540, 570), (DAY, 570, 600)]
+        assert "error" not in await services.book_appointment("Bob", DAY.isoformat(), "09:30")
+
+    run_with_database(scenario)
+
+
+def test_cancel_after_the_range_was_deleted(run_with_database):
+    async def scenario():
+        range_id = await add_range(time(9, 0), time(10, 0))
+        assert "error" not in await services.book_appointment("Ann", DAY.isoformat(), "09:30")
+        await services.delete_time_slot(range_id)
+
+        assert "error" not in await services.cancel_appointment("Ann")
+        # The slot went with its range, so cancelling must not bring it back
+        assert free_slots() == []
+        assert "09:30" not in availability.render()
+        assert (await services.find_nearest_slots(DAY.isoformat(), "09:30"))["nearest"] == []
+
+    run_with_database(scenario)
+
+
+def test_cancel_without_an_appointment(run_with_database):
+    async def scenario():
+        assert "error" in await services.cancel_appointment("Nobody")
+
+    run_with_database(scenario)
@@ -0,0 +1,15 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import bot_tools
+import services
+
+
+def test_tool_turn_for_an_unknown_session_is_404(monkeypatch):
+    monkeypatch.setattr(bot_tools, "BOT_MODE", "tools")
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(services.respond_to_transcription("Book me in on Monday", "expired-session"))
+    assert rejected.value.status_code == 404
+    assert rejected.value.detail == services.SESSION_NOT_FOUND
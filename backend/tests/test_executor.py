@@ -0,0 +1,23 @@
+import asyncio
+
+from executor import LoopLocalLock
+
+
+def test_loop_local_lock_serializes_and_survives_new_loops():
+    lock = LoopLocalLock()
+
+    async def scenario():
+        order = []
+
+        async def holder(name):
+            async with lock:
+                order.append(f"{name} in")
+                await asyncio.sleep(0.01)
+                order.append(f"{name} out")
+
+        await asyncio.gather(holder("a"), holder("b"))
+        return order
+
+    # Each asyncio.run has its own loop, which an asyncio.Lock from the first would refuse
+    for _ in range(2):
+        assert asyncio.run(scenario()) == ["a in", "a out", "b in", "b out"]
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from llm_cache import LLMResponseCache
+
+REPLY = '{"assistant_message_to_the_user": "We are open until five.", "action": null}'
+
+
+class WaitedEvent(threading.Event):
+    # Counts the threads that have started waiting on it
+    def __init__(self):
+        super().__init__()
+        self.waiting = threading.Semaphore(0)
+
+    def wait(self, timeout=None):
+        self.waiting.release()
+        return super().wait(timeout)
+
+
+def start_waiters(cache, flight, count):
+    flight.done = WaitedEvent()
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(cache.lookup(flight.key))) for _ in range(count)]
+    for waiter in waiters:
+        waiter.start()
+    for _ in range(count):
+        assert flight.done.waiting.acquire(timeout=5)
+    return waiters, results
+
+
+@pytest.fixture
+def cache():
+    return LLMResponseCache(max_entries=10, ttl_seconds=60)
+
+
+def test_miss_then_hit(cache):
+    answer, flight = cache.lookup("key")
+    assert answer is None and flight is not None
+    cache.release(flight, REPLY, 1.5)
+
+    assert cache.lookup("key") == (REPLY, None)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["saved_seconds"] == 1.5
+
+
+def test_identical_requests_wait_for_the_first(cache):
+    _, flight = cache.lookup("key")
+    waiters, results = start_waiters(cache, flight, 4)
+    # The waiters block until the first request releases its flight
+    assert results == []
+    cache.release(flight, REPLY, 2.0)
+    for waiter in waiters:
+        waiter.join(timeout=5)
+
+    assert results == [(REPLY, None)] * 4
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["misses"] == 1
+
+
+def test_waiters_ask_themselves_when_the_first_fails(cache):
+    _, flight = cache.lookup("key")
+    (waiter,), results = start_waiters(cache, flight, 1)
+    cache.release(flight)
+    waiter.join(timeout=5)
+
+    assert results == [(None, None)]
+    assert cache.stats()["entries"] == 0
+
+
+def test_write_actions_are_not_shared(cache):
+    _, flight = cache.lookup("key")
+    cache.release(flight, '{"assistant_message_to_the_user": "Booked.", "action": "schedule"}')
+
+    answer, flight = cache.lookup("key")
+    assert answer is None and flight is not None
+
+
+def test_releasing_twice_has_no_effect(cache):
+    _, flight = cache.lookup("key")
+    cache.release(flight, REPLY)
+    cache.release(flight)
+
+    assert cache.lookup("key") == (REPLY, None)
+
+
+def test_invalidate_drops_entries(cache):
+    _, flight = cache.lookup("key")
+    cache.release(flight, REPLY)
+    cache.invalidate()
+
+    answer, flight = cache.lookup("key")
+    assert answer is None and flight is not None
+
+
+def test_answer_from_before_invalidate_is_handed_over_but_not_stored(cache):
+    _, flight = cache.lookup("key")
+    (waiter,), results = start_waiters(cache, flight, 1)
+    cache.invalidate()
+    cache.release(flight, REPLY)
+    waiter.join(timeout=5)
+
+    assert results == [(REPLY, None)]
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b"):
+        cache.release(cache.lookup(key)[1], REPLY)
+    cache.lookup("a")
+    cache.release(cache.lookup("c")[1], REPLY)
+
+    assert cache.lookup("a") == (REPLY, None)
+    assert cache.lookup("b")[0] is None
+
+
+def test_expired_entry_is_requested_again():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=0)
+    cache.release(cache.lookup("key")[1], REPLY)
+
+    answer, flight = cache.lookup("key")
+    assert answer is None and flight is not None
+
+
+def test_disabled_cache_does_not_coalesce():
+    cache = LLMResponseCache(max_entries=0)
+
+    assert cache.lookup("key") == (None, None)
+    assert cache.lookup("key") == (None, None)
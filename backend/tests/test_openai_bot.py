@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import pytest
+
+import services
+from openai_bot import JsonFieldStream, OpenAIBot
+
+FIELD = "assistant_message_to_the_user"
+
+
+def stream_field(document, piece_size):
+    stream = JsonFieldStream(FIELD)
+    return "".join(stream.feed(document[i:i + piece_size]) for i in range(0, len(document), piece_size))
+
+
+@pytest.mark.parametrize("piece_size", [1, 3, 7, 1000])
+@pytest.mark.parametrize("message", [
+    "See you on Monday at 9:30.",
+    'She said "thanks"\\n\t and left / came back',
+    "Booked for Zoë 👋, see you then 🦷!",
+    "中文 and 𝔘𝔫𝔦𝔠𝔬𝔡𝔢",
+])
+def test_streamed_field_matches_json_loads(message, piece_size):
+    for ensure_ascii in (True, False):
+        document = json.dumps({"action": {"type": "none", FIELD: "nested"}, FIELD: message, "note": "x"},
+                              ensure_ascii=ensure_ascii)
+        streamed = stream_field(document, piece_size)
+        assert streamed == message
+        streamed.encode("utf-8")
+
+
+def test_lone_surrogates_are_replaced():
+    document = '{"%s": "a\\ud83d b \\udc4b c\\ud83d"}' % FIELD
+    streamed = stream_field(document, 1)
+    assert streamed == "a\ufffd b \ufffd c"
+    streamed.encode("utf-8")
+
+
+@pytest.mark.parametrize("answer", [None, "", "   ", "not json", "[1, 2]", "```json\n```"])
+def test_ensure_dict_reports_unparseable_answers(answer):
+    assert OpenAIBot.ensure_dict(answer) == {"error": "Failed to parse response"}
+
+
+def test_ensure_dict_strips_code_fences():
+    assert OpenAIBot.ensure_dict('```json\n{"action": null}\n```') == {"action": None}
+
+
+def test_sentence_failing_to_synthesize_is_left_out(monkeypatch):
+    def fail(text):
+        text.encode("utf-8")
+
+    monkeypatch.setattr(services, "synthesize_audio", fail)
+    assert asyncio.run(services.synthesize_sentence("Lone \ud83d surrogate.")) is None
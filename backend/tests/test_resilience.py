@@ -0,0 +1,210 @@
+import threading
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, UpstreamPolicy, UpstreamUnavailable, is_retryable
+
+
+class ServiceUnavailable(Exception):
+    # Retryable, like google.api_core.exceptions.ServiceUnavailable, which is matched by name
+    pass
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def policy(**options):
+    options = dict(dict(deadline=5, retries=2, backoff=0, hedge_percentile=0), **options)
+    return UpstreamPolicy("test", **options)
+
+
+def failing(*errors):
+    # A request raising the given errors in turn, then returning "ok"
+    errors = list(errors)
+    calls = []
+
+    def request(timeout):
+        calls.append(timeout)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return request, calls
+
+
+def test_is_retryable():
+    assert is_retryable(ServiceUnavailable())
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(BadRequest())
+    assert not is_retryable(ValueError())
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failures=3, open_seconds=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.failure()
+    breaker.success()
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.opened == 1
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success():
+    breaker = CircuitBreaker("test", failures=1, open_seconds=0.01)
+    breaker.failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_half_open_reopens_on_failure():
+    breaker = CircuitBreaker("test", failures=5, open_seconds=0.01)
+    for _ in range(5):
+        breaker.failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+    assert not breaker.allow()
+
+
+def test_retries_retryable_errors():
+    upstream = policy()
+    request, calls = failing(ServiceUnavailable(), ServiceUnavailable())
+    assert upstream.call(request) == "ok"
+    assert len(calls) == 3
+    assert upstream.retried == 2
+    assert upstream.outcomes == {"ok": 1, "error": 0, "failed": 0, "rejected": 0}
+
+
+def test_raises_upstream_unavailable_when_the_retries_run_out():
+    upstream = policy()
+    request, calls = failing(*[ServiceUnavailable()] * 3)
+    with pytest.raises(UpstreamUnavailable) as unavailable:
+        upstream.call(request)
+    assert unavailable.value.provider == "test"
+    assert len(calls) == 3
+    assert upstream.outcomes["failed"] == 1
+
+
+def test_does_not_retry_non_idempotent_requests():
+    upstream = policy()
+    request, calls = failing(ServiceUnavailable())
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(request, idempotent=False)
+    assert len(calls) == 1
+    assert upstream.retried == 0
+
+
+def test_raises_other_errors_without_retrying():
+    upstream = policy(retries=5)
+    request, calls = failing(BadRequest())
+    with pytest.raises(BadRequest):
+        upstream.call(request)
+    assert len(calls) == 1
+    assert upstream.outcomes["error"] == 1
+    # The provider answered, so the circuit stays closed
+    assert upstream.breaker._consecutive == 0
+
+
+def test_rejects_calls_while_the_circuit_is_open():
+    upstream = policy(retries=0)
+    upstream.breaker = CircuitBreaker("test", failures=1, open_seconds=60)
+    request, calls = failing(ServiceUnavailable())
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(request)
+    with pytest.raises(UpstreamUnavailable) as unavailable:
+        upstream.call(request)
+    assert "circuit open" in str(unavailable.value)
+    assert unavailable.value.retry_after >= 1
+    assert len(calls) == 1
+    assert upstream.outcomes["rejected"] == 1
+
+
+def test_deadline_bounds_a_stuck_call():
+    upstream = policy(deadline=0.05, retries=0)
+    release = threading.Event()
+    started = time.monotonic()
+    with pytest.raises(UpstreamUnavailable):
+        upstream.call(lambda timeout: release.wait(5))
+    release.set()
+    assert time.monotonic() - started < 1
+    assert upstream.outcomes["failed"] == 1
+
+
+def test_request_is_given_the_time_left():
+    upstream = policy(deadline=2)
+    request, calls = failing()
+    upstream.call(request)
+    assert 0 < calls[0] <= 2
+
+
+def test_slow_attempt_is_hedged_and_the_hedge_wins():
+    upstream = policy(hedge_percentile=50, hedge_min_samples=1)
+    upstream._latencies.extend([0.01] * 10)
+    release = threading.Event()
+    attempts = []
+
+    def request(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            # The first attempt is stuck until the test ends
+            release.wait(5)
+            return "late"
+        return "hedged"
+
+    try:
+        assert upstream.call(request) == "hedged"
+    finally:
+        release.set()
+    assert upstream.hedges == 1
+    assert upstream.hedges_won == 1
+
+
+def test_no_hedge_before_enough_samples_or_when_off():
+    upstream = policy(hedge_percentile=95, hedge_min_samples=20)
+    upstream._latencies.extend([0.01] * 19)
+    assert upstream.hedge_delay() is None
+    upstream._latencies.append(0.01)
+    assert upstream.hedge_delay() == 0.01
+    upstream.hedge_percentile = 0
+    assert upstream.hedge_delay() is None
+
+
+def test_no_hedge_when_disabled_for_the_call():
+    upstream = policy(hedge_percentile=50, hedge_min_samples=1)
+    upstream._latencies.extend([0.001] * 10)
+    assert upstream.call(lambda timeout: time.sleep(0.05) or "ok", hedge=False) == "ok"
+    assert upstream.hedges == 0
+
+
+def test_guard_accounts_outcomes():
+    upstream = policy()
+    upstream.breaker = CircuitBreaker("test", failures=1, open_seconds=60)
+    with upstream.guard():
+        pass
+    with pytest.raises(BadRequest):
+        with upstream.guard():
+            raise BadRequest
+    assert upstream.breaker.state == "closed"
+    with pytest.raises(ServiceUnavailable):
+        with upstream.guard():
+            raise ServiceUnavailable
+    assert upstream.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        with upstream.guard():
+            pass
+    assert upstream.outcomes == {"ok": 1, "error": 1, "failed": 1, "rejected": 1}
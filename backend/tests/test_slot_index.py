@@ -0,0 +1,103 @@
+from datetime import date, time
+
+import pytest
+
+from slot_index import MINUTES_PER_DAY, SlotIndex, format_minute, to_end_minute, to_minute
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY = date(2024, 5, 6), date(2024, 5, 7), date(2024, 5, 8), date(2024, 5, 9)
+
+
+def slots(*rows):
+    return [(day, time(*start), time(*end)) for day, start, end in rows]
+
+
+@pytest.fixture
+def index():
+    index = SlotIndex()
+    index.load_ranges(slots((MONDAY, (9, 0), (12, 0)), (MONDAY, (14, 0), (17, 0)), (TUESDAY, (22, 0), (0, 0))))
+    index.load_free(slots((MONDAY, (9, 0), (9, 30)), (MONDAY, (11, 30), (12, 0)), (MONDAY, (14, 0), (14, 30)),
+                          (THURSDAY, (8, 0), (8, 30))))
+    return index
+
+
+def test_minute_helpers():
+    assert to_minute(time(9, 30)) == 570
+    assert to_end_minute(time(0, 0)) == MINUTES_PER_DAY
+    assert format_minute(570) == "09:30"
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ((8, 0), (9, 0), None),
+    ((12, 0), (14, 0), None),
+    ((8, 0), (9, 1), (MONDAY, 540, 720)),
+    ((11, 59), (13, 0), (MONDAY, 540, 720)),
+    ((10, 0), (11, 0), (MONDAY, 540, 720)),
+    ((13, 0), (18, 0), (MONDAY, 840, 1020)),
+    ((8, 0), (18, 0), (MONDAY, 540, 720)),
+])
+def test_overlap(index, start, end, expected):
+    assert index.overlap(MONDAY, time(*start), time(*end)) == expected
+
+
+def test_overlap_with_a_range_ending_at_midnight(index):
+    assert index.overlap(TUESDAY, time(23, 0), time(0, 0)) == (TUESDAY, 1320, MINUTES_PER_DAY)
+    assert index.overlap(TUESDAY, time(21, 0), time(22, 0)) is None
+    assert index.overlap(THURSDAY, time(9, 0), time(10, 0)) is None
+
+
+def test_next_free_continues_onto_later_days(index):
+    assert index.next_free(MONDAY, 600, limit=3) == [(MONDAY, 690, 720), (MONDAY, 840, 870), (THURSDAY, 480, 510)]
+    assert index.next_free(TUESDAY) == [(THURSDAY, 480, 510)]
+
+
+def test_next_free_same_day(index):
+    assert index.next_free(MONDAY, 841, same_day=True) == []
+    assert index.next_free(TUESDAY, same_day=True) == []
+    assert index.next_free(MONDAY, 690, same_day=True) == [(MONDAY, 690, 720), (MONDAY, 840, 870)]
+
+
+def test_nearest_free(index):
+    assert index.nearest_free(MONDAY, 720) == [(MONDAY, 690, 720)]
+    assert index.nearest_free(MONDAY, 780, limit=2) == [(MONDAY, 840, 870), (MONDAY, 690, 720)]
+    # The earlier slot wins a tie
+    assert index.nearest_free(MONDAY, 765) == [(MONDAY, 690, 720)]
+    # Across days: Monday 14:00 is 22 hours before Tuesday noon, Thursday 8:00 44 hours after
+    assert index.nearest_free(TUESDAY, 720) == [(MONDAY, 840, 870)]
+    assert index.nearest_free(WEDNESDAY, 1440) == [(THURSDAY, 480, 510)]
+
+
+def test_nearest_free_same_day(index):
+    assert index.nearest_free(TUESDAY, 720, same_day=True) == []
+    assert index.nearest_free(THURSDAY, 0, limit=5, same_day=True) == [(THURSDAY, 480, 510)]
+
+
+def test_nearest_free_empty_index():
+    assert SlotIndex().nearest_free(MONDAY, 600) == []
+    assert SlotIndex().next_free(MONDAY) == []
+
+
+def test_remove_free_drops_slots_within_the_range(index):
+    index.remove_free(MONDAY, time(9, 0), time(12, 0))
+    assert index.next_free(MONDAY, same_day=True) == [(MONDAY, 840, 870)]
+
+    index.remove_free(THURSDAY, time(8, 0), time(8, 30))
+    index.remove_free(THURSDAY, time(8, 0), time(8, 30))
+    assert index.next_free(TUESDAY) == []
+    assert index.stats()["days"] == 1
+
+
+def test_add_free_and_add_range_are_idempotent(index):
+    stats = index.stats()
+    index.add_free(MONDAY, time(9, 0), time(9, 30))
+    index.add_range(MONDAY, time(9, 0), time(12, 0))
+    assert index.stats() == stats
+
+    index.add_free(TUESDAY, time(23, 30), time(0, 0))
+    assert index.next_free(TUESDAY) == [(TUESDAY, 1410, MINUTES_PER_DAY), (THURSDAY, 480, 510)]
+
+
+def test_remove_range(index):
+    index.remove_range(TUESDAY, time(22, 0), time(0, 0))
+    index.remove_range(TUESDAY, time(22, 0), time(0, 0))
+    assert index.overlap(TUESDAY, time(23, 0), time(0, 0)) is None
+    assert index.stats()["ranges"] == 2
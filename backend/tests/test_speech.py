@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import models
+import services
+from resilience import CircuitBreaker, UpstreamUnavailable
+
+AUDIO = b"\xff\xfb\x90\x00" * 4
+
+
+def synthesize(request):
+    async def scenario():
+        response = await services.synthesize_speech(models.SynthesizeRequest(text=request))
+        return response.status_code, b"".join([chunk async for chunk in response.body_iterator])
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def tts(monkeypatch):
+    # Sentences containing "fail" cannot be synthesized; nothing is cached
+    def synthesize_audio(text):
+        if "fail" in text:
+            raise UpstreamUnavailable("tts", "circuit open", retry_after=7)
+        return AUDIO
+
+    monkeypatch.setattr(services, "synthesize_audio", synthesize_audio)
+    monkeypatch.setattr(services.tts_cache, "get", lambda *key: None)
+
+
+def test_reply_is_streamed(tts):
+    assert synthesize("Hello there. See you soon.") == (200, AUDIO * 2)
+
+
+def test_unvoiced_sentences_are_left_out(tts):
+    assert synthesize("Hello there. This will fail. See you soon.") == (200, AUDIO * 2)
+
+
+def test_reply_without_any_audio_is_503(tts, monkeypatch):
+    # Retry-After is when the TTS circuit lets calls through again
+    breaker = CircuitBreaker("tts", failures=1, open_seconds=7)
+    breaker.failure()
+    monkeypatch.setattr(services.tts_policy, "breaker", breaker)
+    with pytest.raises(HTTPException) as unavailable:
+        synthesize("This will fail. This will fail too.")
+    assert unavailable.value.status_code == 503
+    assert unavailable.value.headers == {"Retry-After": "7"}
+
+
+def test_cached_apology_stands_in_for_a_reply_without_audio(tts, monkeypatch):
+    apology = b"sorry"
+    monkeypatch.setattr(services.tts_cache, "get",
+                        lambda text, *key: apology if text == services.TTS_FALLBACK_PHRASE else None)
+    assert synthesize("This will fail.") == (200, apology)
@@ -0,0 +1,33 @@
+import asyncio
+from datetime import date, time
+
+import pytest
+from fastapi import HTTPException
+
+import models
+import services
+
+
+def template(start_date, end_date):
+    return models.WeeklyTemplate(start_date=start_date, end_date=end_date,
+                                 days={"monday": [models.TimeRange(start_time="09:00", end_time="17:00")]})
+
+
+def test_template_over_a_year_is_rejected():
+    with pytest.raises(HTTPException) as rejected:
+        services.expand_weekly_template(template("2024-01-01", "2030-12-31"))
+    assert rejected.value.status_code == 422
+
+
+def test_template_up_to_the_limit_is_expanded():
+    ranges = services.expand_weekly_template(template("2024-01-01", "2024-12-31"))
+    assert len(ranges) == 53
+    assert ranges[0] == (date(2024, 1, 1), time(9, 0), time(17, 0))
+
+
+def test_too_many_slots_are_rejected_before_writing(monkeypatch):
+    monkeypatch.setattr(services, "BULK_MAX_SLOTS", 16)
+    ranges = [(date(2024, 1, 1), time(9, 0), time(17, 0)), (date(2024, 1, 2), time(9, 0), time(9, 30))]
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(services.insert_main_time_slots(ranges))
+    assert rejected.value.status_code == 422
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Total size of synthesized audio kept in memory, in bytes
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Directory for the on-disk tier, which only holds the pre-warmed phrases every caller hears; set to
+# an empty string to keep the cache in memory only. Created on the first write.
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', './tts_cache')
+# Optional file with one phrase per line to synthesize at startup, in addition to DEFAULT_PHRASES
+TTS_PREWARM_FILE = os.getenv('TTS_PREWARM_FILE')
+# Set to 0 to skip pre-warming at startup
+TTS_PREWARM = os.getenv('TTS_PREWARM', '1') != '0'
+
+# Sentences the bot and the patient page say to every caller
+DEFAULT_PHRASES = [
+    "Welcome to Dr. Walnut's Clinic!",
+    "Would you like to schedule, reschedule, or cancel an appointment?",
+    "Sorry, I couldn't understand that.",
+    "Sorry, I couldn't process your request.",
+]
+
+
+def cache_key(text, voice, encoding):
+    return hashlib.sha256(f"{voice}\x1f{encoding}\x1f{text}".encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio keyed on (text, voice, encoding), with a bounded
+    in-memory LRU tier in front of an optional on-disk tier. Only audio put with persist=True goes
+    to disk: sentences said to one caller may name them or their appointment, and would otherwise
+    pile up there without bound.
+    """
+
+    def __init__(self, max_bytes=TTS_CACHE_MAX_BYTES, directory=TTS_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory or None
+        self.memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text, voice, encoding):
+        key = cache_key(text, voice, encoding)
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+
+        audio = self._read_disk(key)
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, text, voice, encoding, audio, persist=False):
+        key = cache_key(text, voice, encoding)
+        with self._lock:
+            self._remember(key, audio)
+        if persist:
+            self._write_disk(key, audio)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+        }
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._entries[key] = audio
+        self.memory_bytes += len(audio)
+        while self.memory_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key, audio):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(audio)
+        os.replace(temp_path, path)
+
+
+def prewarm_phrases():
+    phrases = list(DEFAULT_PHRASES)
+    if TTS_PREWARM_FILE:
+        with open(TTS_PREWARM_FILE, 'r', encoding='utf-8') as file:
+            phrases.extend(line.strip() for line in file if line.strip())
+    return phrases
+
+
+tts_cache = TTSCache()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import API from "./api";
 
 function UserPage() {
@@ -7,11 +7,14 @@ function UserPage() {
     const [audioURL, setAudioURL] = useState('');
     const [transcription, setTranscription] = useState('');
     const [started, setStarted] = useState(false);
+    const sessionId = useRef(null);
 
     const startProcess = async () => {
         try {
-            // Clear history
-            await API.post('/clear-history/');
+            // Clear history and start a new conversation session
+            const previousSession = sessionId.current ? { params: { session_id: sessionId.current } } : {};
+            const session = await API.post('/clear-history/', null, previousSession);
+            sessionId.current = session.data.session_id;
             console.log('History cleared successfully');
             // Play the initial welcome message
             const welcomeText = "Welcome to Dr. Walnut's Clinic! Would you like to schedule, reschedule, or cancel an appointment?";
@@ -30,35 +33,62 @@ function UserPage() {
             const recorder = new MediaRecorder(stream);
             setMediaRecorder(recorder);
 
-            let chunks = [];
-            recorder.ondataavailable = e => chunks.push(e.data);
-            recorder.onstop = async () => {
-                const blob = new Blob(chunks, { type: 'audio/wav' });
-                chunks = [];
-                const audioUrl = URL.createObjectURL(blob);
-                setAudioURL(audioUrl);
-
-                // Upload audio file to the backend for transcription
-                const formData = new FormData();
-                formData.append('file', blob, 'user_audio.wav');
-                const response = await API.post('/transcribe/', formData, {
-                    headers: {
-                        'Content-Type': 'multipart/form-data',
-                    },
-                    responseType: 'blob'  // Important for handling the binary audio response
-                });
-                try{
-                // Creating a URL for the blob response
-                const audioUrlResponse = URL.createObjectURL(response.data);
+            // Stream audio chunks to the backend while the patient is still speaking
+            const socketURL = API.defaults.baseURL.replace(/^http/, 'ws');
+            const socket = new WebSocket(`${socketURL}/ws/transcribe/?session_id=${sessionId.current}`);
+            socket.binaryType = 'blob';
+            const replyQueue = [];
+            const playNextReply = () => {
+                if (replyQueue.length === 0) {
+                    return;
+                }
+                try {
+                // Creating a URL for the audio reply
+                const audioUrlResponse = URL.createObjectURL(replyQueue[0]);
+                setAudioURL(audioUrlResponse);
                 const audioToPlay = new Audio(audioUrlResponse);
+                audioToPlay.onended = () => {
+                    replyQueue.shift();
+                    playNextReply();
+                };
                 audioToPlay.play();
                 } catch (error) {
                 console.error('Error synthesizing text to speech:', error);
                 }
             };
+            socket.onmessage = (event) => {
+                if (typeof event.data === 'string') {
+                    const message = JSON.parse(event.data);
+                    if (message.type === 'interim' || message.type === 'final') {
+                        setTranscription(message.transcript);
+                    } else if (message.type === 'error') {
+                        setTranscription(message.detail);
+                    }
+                    return;
+                }
+                // Each binary message is one synthesized sentence; play them back to back
+                replyQueue.push(event.data);
+                if (replyQueue.length === 1) {
+                    playNextReply();
+                }
+            };
 
-            recorder.start();
-            setIsRecording(true);
+            recorder.ondataavailable = e => {
+                if (e.data.size > 0 && socket.readyState === WebSocket.OPEN) {
+                    socket.send(e.data);
+                }
+            };
+            recorder.onstop = () => {
+                stream.getTracks().forEach(track => track.stop());
+                if (socket.readyState === WebSocket.OPEN) {
+                    socket.send('stop');
+                }
+            };
+
+            socket.onopen = () => {
+                recorder.start(250);
+                setIsRecording(true);
+            };
         } else {
             console.error('Audio recording is not supported in this browser.');
         }